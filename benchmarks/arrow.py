@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+Benchmark of exporting records to Parquet and Feather with xml2arrow_file, against converting them with
+xml2json_iter alone. Requires pyarrow.
+Run from the repository root: python benchmarks/arrow.py [size ...]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+from fixtures import mixed, parse_size  # noqa: E402
+from xml2js import xml2arrow_file, xml2json_iter  # noqa: E402
+
+
+def run(size, number=3):
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'records.xml')
+        with open(source, 'wb') as f:
+            f.write(mixed(parse_size(size)))
+        convert = min(timeit.repeat(lambda: sum(1 for _ in xml2json_iter(source, 'record', compact=True)),
+                                    number=1, repeat=number))
+        print(f'{size:>8} xml2json_iter   {convert:8.3f}s')
+        for file_format in ('parquet', 'feather'):
+            destination = os.path.join(directory, f'records.{file_format}')
+            seconds = min(timeit.repeat(lambda: xml2arrow_file(source, destination, 'record', file_format),
+                                        number=1, repeat=number))
+            print(f'{size:>8} {file_format:<15} {seconds:8.3f}s   x{seconds / convert:.2f} of conversion   '
+                  f'{os.path.getsize(destination) / os.path.getsize(source):.2f} of xml size')
+
+
+if __name__ == '__main__':
+    for size in sys.argv[1:] or ('1MB', '16MB'):
+        run(size)
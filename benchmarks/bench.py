@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for xml2json over document shapes, sizes and output modes.
+Reports throughput (MB/s and elements/s) and peak Python memory, and compares against a stored baseline.
+
+Run from the repository root:
+    python benchmarks/bench.py                                  # default shapes and sizes
+    python benchmarks/bench.py --sizes 1KB 1MB 1GB --shapes mixed
+    python benchmarks/bench.py --save-baseline                  # store the results as benchmarks/baseline.json
+    python benchmarks/bench.py --check                          # exit 1 on a regression against the baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+from lxml import etree  # noqa: E402
+from fixtures import SHAPES, parse_size  # noqa: E402
+from xml2js import xml2json, xml2json_string  # noqa: E402
+
+APIS = dict(xml2json=xml2json, xml2json_string=xml2json_string)
+MODES = dict(compact=dict(compact=True), noncompact=dict(compact=False))
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+
+def measure(convert, xml, options, repeat):
+    """
+    This function times one conversion and measures its peak traced memory in a separate run.
+    :param convert: function, the conversion API,
+    :param xml: bytes, the document,
+    :param options: dict, keyword options of the API,
+    :param repeat: int, the number of timed runs, the fastest one is kept,
+    :return: (float, int) tuple of seconds and peak bytes.
+    """
+    gc.collect()
+    seconds = min(timeit.repeat(lambda: convert(xml, **options), number=1, repeat=repeat))
+    tracemalloc.start()
+    output = convert(xml, **options)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del output
+    return seconds, peak
+
+
+def run(shapes, sizes, modes, apis, repeat):
+    """
+    This function runs the benchmark matrix and prints one line per case.
+    :return: dict of case name to result dict.
+    """
+    results = {}
+    for shape in shapes:
+        for size in sizes:
+            xml = SHAPES[shape](parse_size(size))
+            elements = sum(1 for _ in etree.fromstring(xml, parser=etree.XMLParser(huge_tree=True)).iter())
+            for api in apis:
+                for mode in modes:
+                    seconds, peak = measure(APIS[api], xml, MODES[mode], repeat if len(xml) < 2 ** 27 else 1)
+                    name = f'{shape}/{size}/{api}/{mode}'
+                    results[name] = dict(bytes=len(xml), elements=elements, seconds=seconds,
+                                         mb_per_s=len(xml) / seconds / 1e6, elements_per_s=elements / seconds,
+                                         peak_mb=peak / 1e6)
+                    print(f'{name:<44}{results[name]["mb_per_s"]:10.2f} MB/s{results[name]["elements_per_s"]:14.0f} '
+                          f'elem/s{results[name]["peak_mb"]:12.2f} MB peak', flush=True)
+            del xml
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    This function prints the throughput of every case relative to the baseline.
+    :param tolerance: float, the allowed relative slowdown before a case counts as a regression,
+    :return: list of str, the regressed case names.
+    """
+    regressions = []
+    print(f'\n{"case":<44}{"baseline":>12}{"current":>12}{"ratio":>8}')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['mb_per_s'] / baseline[name]['mb_per_s']
+        flag = ''
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<44}{baseline[name]["mb_per_s"]:12.2f}{result["mb_per_s"]:12.2f}{ratio:8.2f}{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--shapes', nargs='+', default=list(SHAPES), choices=list(SHAPES))
+    parser.add_argument('--sizes', nargs='+', default=['1KB', '100KB', '4MB'],
+                        help='document sizes, e.g. 1KB 10MB 1GB')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--apis', nargs='+', default=['xml2json'], choices=list(APIS))
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the fastest is kept')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown, default 0.2')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.shapes, args.sizes, args.modes, args.apis, args.repeat)
+    report = dict(python=platform.python_version(), machine=platform.machine(), results=results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        if args.check and regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Benchmark of MessagePack and CBOR output with xml2json_binary, against JSON text from xml2json_bytes and against
+packing xml2json's dicts with the msgpack and cbor2 packages when they are installed.
+Run from the repository root: python benchmarks/binary.py [size]
+"""
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+from fixtures import SHAPES, parse_size  # noqa: E402
+from xml2js import xml2json, xml2json_binary, xml2json_bytes  # noqa: E402
+
+
+def packers():
+    """
+    This function returns the installed third-party packers, used for the dict-based baseline.
+    :return: dict of str and function.
+    """
+    output = {}
+    try:
+        import msgpack
+        output['msgpack'] = msgpack.packb
+    except ImportError:
+        pass
+    try:
+        import cbor2
+        output['cbor'] = cbor2.dumps
+    except ImportError:
+        pass
+    return output
+
+
+def run(size, number=3):
+    third_party = packers()
+    for shape, generate in SHAPES.items():
+        xml = generate(parse_size(size))
+        cases = [('json', lambda: xml2json_bytes(xml, compact=True))]
+        for binary_format in ('msgpack', 'cbor'):
+            cases.append((binary_format, lambda f=binary_format: xml2json_binary(xml, compact=True, binary_format=f)))
+            cases.append((f'{binary_format}+keys', lambda f=binary_format: xml2json_binary(
+                xml, compact=True, binary_format=f, key_table=True)))
+            if binary_format in third_party:
+                cases.append((f'{binary_format} dicts', lambda f=third_party[binary_format]: f(
+                    xml2json(xml, compact=True))))
+        for name, case in cases:
+            seconds = min(timeit.repeat(case, number=1, repeat=number))
+            print(f'{shape:>10} {size:>6} {name:<15} {seconds * 1000:9.1f}ms {len(case()):>10} bytes')
+
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else '4MB')
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""
+Benchmark of xml2json against a converter compiled from a sample of the same document shape.
+Run from the repository root: python benchmarks/compiled.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from xml2js import compile_converter, xml2json  # noqa: E402
+
+
+def order_xml(index, lines=3):
+    """
+    This function builds one small order document; the number of lines varies the list/scalar grouping.
+    :param index: int, the order number,
+    :param lines: int, the number of order lines,
+    :return: bytes.
+    """
+    items = b''.join(b'<line sku="S%d" qty="%d"><name>Item %d</name><price currency="EUR">%d.50</price></line>'
+                     % (line, line + 1, line, line) for line in range(lines))
+    return (b'<order id="%d" status="open"><customer><name>Customer %d</name><email>c%d@example.com</email>'
+            b'</customer><lines>%s</lines><note>deliver after 5pm</note></order>' % (index, index, index, items))
+
+
+def run(count, number=3):
+    documents = [order_xml(index, index % 4 + 1) for index in range(count)]
+    convert = compile_converter([order_xml(0, 1), order_xml(0, 2)])
+    for document in documents:
+        assert json.dumps(convert(document)) == json.dumps(xml2json(document, compact=True))
+    generic = min(timeit.repeat(lambda: [xml2json(document, compact=True) for document in documents],
+                                number=1, repeat=number))
+    compiled = min(timeit.repeat(lambda: [convert(document) for document in documents], number=1, repeat=number))
+    print(f'{count:>8} documents   xml2json {generic * 1000:9.2f}ms   compiled {compiled * 1000:9.2f}ms   '
+          f'x{generic / compiled:.2f}   {convert.stats()}')
+
+
+if __name__ == '__main__':
+    for count in (100, 1000, 10000):
+        run(count)
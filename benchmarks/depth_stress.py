@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Depth-stress benchmark comparing the recursive parseelement with the iterative walkelement.
+Run from the repository root: python benchmarks/depth_stress.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from xml2js import parseelement, parsexml, walkelement  # noqa: E402
+
+
+def deep_xml(depth):
+    """
+    This function builds a document nested depth levels deep, with an attribute and text on every level.
+    :param depth: int, the nesting depth,
+    :return: bytes.
+    """
+    return b'<root>' + b'<node id="1">text' * depth + b'</node>' * depth + b'</root>'
+
+
+def wide_xml(width):
+    """
+    This function builds a flat document of width small sibling elements.
+    :param width: int, the number of children of the root,
+    :return: bytes.
+    """
+    return b'<root>' + b'<item id="1"><name>a</name></item>' * width + b'</root>'
+
+
+def run(label, xml, number=5):
+    root = parsexml(xml, huge_tree=True)
+    row = [label]
+    for convert in (parseelement, walkelement):
+        for compact in (False, True):
+            result = convert(root, compact=compact)
+            if isinstance(result, Exception):
+                row.append('failed')
+                continue
+            seconds = min(timeit.repeat(lambda: convert(root, compact=compact), number=1, repeat=number))
+            row.append(f'{seconds * 1000:.2f}ms')
+    print('{:<14}{:>14}{:>14}{:>14}{:>14}'.format(*row))
+
+
+if __name__ == '__main__':
+    print('{:<14}{:>14}{:>14}{:>14}{:>14}'.format('document', 'recursive', 'recursive/c', 'iterative', 'iterative/c'))
+    for depth in (100, 500, 900, 2000):
+        run(f'deep {depth}', deep_xml(depth))
+    for width in (1000, 10000):
+        run(f'wide {width}', wide_xml(width))
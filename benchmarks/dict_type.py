@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""
+Throughput and memory of xml2json output built from OrderedDict against plain dict, on a large record document.
+Run from the repository root: python benchmarks/dict_type.py
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from xml2js import xml2json  # noqa: E402
+
+
+def records_xml(count):
+    """
+    This function builds a record-oriented document with attributes and text.
+    :param count: int, the number of records,
+    :return: bytes.
+    """
+    record = b'<item id="1" type="book"><name>Some title</name><price currency="USD">12.50</price></item>'
+    return b'<catalog>' + record * count + b'</catalog>'
+
+
+def run(xml, dict_type, compact, number=3):
+    seconds = min(timeit.repeat(lambda: xml2json(xml, compact=compact, dict_type=dict_type), number=1,
+                                repeat=number))
+    tracemalloc.start()
+    output = xml2json(xml, compact=compact, dict_type=dict_type)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del output
+    mode = 'compact' if compact else 'non-compact'
+    print(f'{dict_type.__name__:<12}{mode:<12}{len(xml) / seconds / 1e6:8.2f} MB/s  '
+          f'output {size / 1e6:8.2f} MB  peak {peak / 1e6:8.2f} MB')
+
+
+if __name__ == '__main__':
+    xml = records_xml(50000)
+    print(f'fixture: {len(xml) / 1e6:.2f} MB, 50000 records')
+    for compact in (False, True):
+        for dict_type in (OrderedDict, dict):
+            run(xml, dict_type, compact)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Synthetic xml fixtures for the benchmark suite.
+Every generator is deterministic and repeats a record unit until the document reaches the requested size.
+"""
+import random
+
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(size):
+    """
+    This function converts a size such as '1KB', '10MB' or '1GB' to bytes.
+    :param size: str or int,
+    :return: int.
+    """
+    if isinstance(size, int):
+        return size
+    size = size.strip().upper()
+    for unit in ('GB', 'MB', 'KB', 'B'):
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(size)
+
+
+def repeat_units(unit, size, head=b'<root>', tail=b'</root>'):
+    """
+    This function repeats the record unit between head and tail until the document is about size bytes.
+    :param unit: function taking the record index and returning bytes,
+    :param size: int, the target size in bytes,
+    :return: bytes.
+    """
+    parts = [head]
+    total = len(head) + len(tail)
+    index = 0
+    while total < size or index == 0:
+        part = unit(index)
+        parts.append(part)
+        total += len(part)
+        index += 1
+    parts.append(tail)
+    return b''.join(parts)
+
+
+def wide(size):
+    """Many small siblings directly under the root."""
+    return repeat_units(lambda index: b'<item>%d</item>' % index, size)
+
+
+def deep(size, depth=200):
+    """Chains of elements nested depth levels deep, kept under libxml2's default depth limit."""
+    chain = b''.join(b'<level n="%d">t' % level for level in range(depth)) + b'</level>' * depth
+    return repeat_units(lambda index: chain, size)
+
+
+def attributes(size, count=20):
+    """Empty elements carrying many attributes each."""
+    attrs = b' '.join(b'attribute%d="value %d"' % (index, index) for index in range(count))
+    return repeat_units(lambda index: b'<item id="%d" ' % index + attrs + b'/>', size)
+
+
+def text(size, length=2000):
+    """Few elements with long text, including characters that need escaping in JSON."""
+    body = (b'Lorem ipsum dolor sit amet, "quoted" \\ text &amp; more. ' * (length // 56 + 1))[:length]
+    return repeat_units(lambda index: b'<p>' + body + b'</p>', size)
+
+
+def cdata(size, length=200):
+    """Elements whose content is CDATA sections mixed with plain text."""
+    body = (b'<b>markup</b> & symbols ' * (length // 24 + 1))[:length]
+    return repeat_units(lambda index: b'<script>x<![CDATA[' + body + b']]>y<![CDATA[' + body + b']]></script>', size)
+
+
+def mixed(size, seed=0):
+    """Records of nested elements, attributes, repeated tags, text, CDATA, comments and tails."""
+    rng = random.Random(seed)
+
+    def unit(index):
+        tags = b''.join(b'<tag>t%d</tag>' % rng.randint(0, 9) for _ in range(rng.randint(1, 4)))
+        return (b'<record id="%d" kind="k%d"><name>Name %d</name>%s<body>lead <em>emphasis</em> tail'
+                b'<![CDATA[raw <data>]]></body><!-- note --><empty/></record>'
+                % (index, rng.randint(0, 3), index, tags))
+    return repeat_units(unit, size)
+
+
+SHAPES = dict(wide=wide, deep=deep, attributes=attributes, text=text, cdata=cdata, mixed=mixed)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Benchmark of the memory held by converted output with tag and attribute names interned (the default) and
+without (names=False), for whole documents and for the records of a stream.
+Run from the repository root: python benchmarks/interning.py [size]
+"""
+import gc
+import io
+import os
+import sys
+import timeit
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+from fixtures import SHAPES, mixed, parse_size  # noqa: E402
+from xml2js import RecordConverter, walkelement, xml2json  # noqa: E402
+from lxml import etree  # noqa: E402
+
+
+def retained(convert):
+    """
+    This function measures the memory still held by the result of a conversion.
+    :param convert: function, returns the output,
+    :return: int, bytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    output = convert()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del output
+    return size
+
+
+def report(name, convert):
+    sizes = {}
+    for label, names in (('plain', False), ('interned', None)):
+        sizes[label] = retained(lambda: convert(names))
+        seconds = min(timeit.repeat(lambda: convert(names), number=1, repeat=2))
+        print(f'{name:<28} {label:<9} {sizes[label] / 1e6:9.2f} MB held {seconds * 1000:9.1f}ms')
+    print(f'{name:<28} saved     {(sizes["plain"] - sizes["interned"]) / 1e6:9.2f} MB '
+          f'({1 - sizes["interned"] / sizes["plain"]:.0%})')
+
+
+def run(size):
+    for shape, generate in SHAPES.items():
+        xml = generate(parse_size(size))
+        for compact in (True, False):
+            report(f'{shape}/{size}/{"compact" if compact else "noncompact"}',
+                   lambda names: xml2json(xml, compact=compact, names=names))
+    xml = mixed(parse_size(size))
+
+    def stream(names):
+        events = etree.iterparse(io.BytesIO(xml), events=('start', 'end'))
+        return list(RecordConverter('record', walkelement, header=False, compact=True, names=names).convert(events))
+    report(f'records/{size}/compact', stream)
+
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else '1MB')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Benchmark of peak RSS when xml2json reads a large file as bytes, as str, by path and through mmap.
+Every case runs in its own process; the lazy view keeps the output small so the input dominates.
+Run from the repository root: python benchmarks/mmap_input.py [size], 2GB by default.
+"""
+import mmap
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+from fixtures import SHAPES, parse_size  # noqa: E402
+from xml2js import xml2json  # noqa: E402
+
+CASES = ('bytes', 'str', 'path', 'mmap')
+
+
+def convert(case, path):
+    """
+    This function converts the file the way the case reads it.
+    :param case: str, one of CASES,
+    :param path: str, the xml file.
+    """
+    if case == 'bytes':
+        with open(path, 'rb') as f:
+            xml2json(f.read(), compact=True, lazy=True)
+    elif case == 'str':
+        with open(path, encoding='utf-8') as f:
+            xml2json(f.read(), compact=True, lazy=True)
+    elif case == 'path':
+        xml2json(pathlib.Path(path), compact=True, lazy=True)
+    else:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            xml2json(data, compact=True, lazy=True)
+
+
+def run(size, shape='text'):
+    with tempfile.NamedTemporaryFile(suffix='.xml', delete=False) as f:
+        pass
+    # The file is written by another process: a child's peak RSS starts from what its parent holds when it forks.
+    subprocess.run([sys.executable, __file__, '--write', shape, size, f.name], check=True)
+    try:
+        for case in CASES:
+            output = subprocess.run([sys.executable, __file__, '--case', case, f.name], check=True,
+                                    stdout=subprocess.PIPE, universal_newlines=True).stdout.split()
+            print(f'{size:>8} {shape:<6} {case:<6} {float(output[0]):8.2f}s {int(output[1]) / 1024:10.1f} MB peak RSS')
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--write']:
+        with open(sys.argv[4], 'wb') as f:
+            f.write(SHAPES[sys.argv[2]](parse_size(sys.argv[3])))
+    elif sys.argv[1:2] == ['--case']:
+        start = time.perf_counter()
+        convert(sys.argv[2], sys.argv[3])
+        print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    else:
+        run(sys.argv[1] if len(sys.argv) > 1 else '2GB')
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+Benchmark of xml2json against xml2json_parallel on one large record-oriented file.
+Run from the repository root: python benchmarks/parallel.py [size] [workers ...]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+from fixtures import mixed, parse_size  # noqa: E402
+from xml2js import xml2json, xml2json_parallel  # noqa: E402
+
+
+def run(size, workers):
+    xml = mixed(parse_size(size))
+    with tempfile.NamedTemporaryFile(suffix='.xml', delete=False) as f:
+        f.write(xml)
+    try:
+        serial = min(timeit.repeat(lambda: xml2json(xml, compact=True), number=1, repeat=2))
+        print(f'{size:>8} xml2json            {serial:8.2f}s')
+        for count in workers:
+            seconds = min(timeit.repeat(lambda: xml2json_parallel(f.name, workers=count, compact=True),
+                                        number=1, repeat=2))
+            print(f'{size:>8} parallel {count:>3} workers {seconds:8.2f}s   x{serial / seconds:.2f}')
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else '64MB',
+        [int(count) for count in sys.argv[2:]] or sorted({1, 2, 4, os.cpu_count() or 1}))
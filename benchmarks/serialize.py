@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""
+Benchmark of json.dumps(xml2json(...)) against the direct xml2json_string writer.
+Run from the repository root: python benchmarks/serialize.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from xml2js import xml2json, xml2json_string  # noqa: E402
+
+
+def records_xml(count):
+    """
+    This function builds a record-oriented document with attributes, text and CDATA.
+    :param count: int, the number of records,
+    :return: bytes.
+    """
+    record = (b'<item id="1" type="book"><name>Some title</name><price currency="USD">12.50</price>'
+              b'<note><![CDATA[<b>bold</b>]]></note><tag>a</tag><tag>b</tag></item>')
+    return b'<catalog>' + record * count + b'</catalog>'
+
+
+def run(count, number=3):
+    xml = records_xml(count)
+    for compact in (False, True):
+        assert json.dumps(xml2json(xml, compact=compact)) == xml2json_string(xml, compact=compact)
+        dumps = min(timeit.repeat(lambda: json.dumps(xml2json(xml, compact=compact)), number=1, repeat=number))
+        direct = min(timeit.repeat(lambda: xml2json_string(xml, compact=compact), number=1, repeat=number))
+        mode = 'compact' if compact else 'non-compact'
+        print(f'{count:>8} records {mode:<12} json.dumps {dumps * 1000:9.2f}ms   '
+              f'xml2json_string {direct * 1000:9.2f}ms   x{dumps / direct:.2f}')
+
+
+if __name__ == '__main__':
+    for count in (100, 1000, 10000):
+        run(count)
@@ -10,11 +10,16 @@ setup(name='xml2js',
       author_email='yangzhengzhi.roy@gmail.com',
       py_modules=['xml2js'],
       platforms=['all'],
-      python_requires='>=3.5',
+      python_requires='>=3.7',
       install_requires=['lxml>=4.2.0'],
+      extras_require={'arrow': ['pyarrow>=8.0']},
+      entry_points={'console_scripts': ['xml2js=xml2js:main']},
       classifiers=[
           'Intended Users: Developers',
-          'Programming Language :: Python :: 3.5',
-          'Programming Language :: Python :: 3.6',
+          'Programming Language :: Python :: 3.7',
+          'Programming Language :: Python :: 3.8',
+          'Programming Language :: Python :: 3.9',
+          'Programming Language :: Python :: 3.10',
+          'Programming Language :: Python :: 3.11',
       ]
       )
@@ -0,0 +1,42 @@
+"""
+Shared documents and helpers for the tests.
+Run from the repository root: python -m pytest -q
+"""
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'benchmarks'))
+from fixtures import SHAPES  # noqa: E402
+
+SAMPLES = [
+    b'<a/>',
+    b'<a x="1">hi</a>',
+    b'<?xml version="1.0"?><root><!-- c --><?pi some data?><a x="1" y="2">t<b>u</b>v<![CDATA[w]]><b>z</b><c/></a>'
+    b'<a>two</a>tail</root>',
+    b'<root><item id="1"><name>A</name><price>1.5</price></item>'
+    b'<item id="2"><name><![CDATA[B<>]]></name><price>2</price></item></root>',
+    b'<r>  <x>  </x> <y>a<![CDATA[b]]>c</y><z><![CDATA[q]]></z><w>q</w></r>',
+    b'<r xmlns:n="urn:x"><n:a n:b="1">t</n:a><a>\xc3\xa9</a></r>',
+    b'<r>' + b'<d>' * 50 + b'x' + b'</d>' * 50 + b'</r>',
+    b'<r><a>1</a><b>2</b><a>3</a><!--c1--><!--c2--><?p1 x?><?p2 y?></r>',
+    b'<r><a><![CDATA[one]]><![CDATA[two]]></a>mixed<![CDATA[three]]></r>',
+    b'<r><e>&amp;&lt;"\'</e><f a="&quot;&amp;"/></r>',
+    b'<r><a><![CDATA[1]]>2<![CDATA[3]]>4</a><b>\xe2\x98\x83 \\ "q"</b><!----></r>',
+]
+SAMPLES += [SHAPES[shape](4096) for shape in sorted(SHAPES)]
+OPTIONS = [dict(), dict(compact=True), dict(strip_cdata=True), dict(compact=True, strip_cdata=True),
+           dict(remove_blank_text=False), dict(compact=True, remove_blank_text=False), dict(header=False),
+           dict(compact=True, header=False), dict(remove_comments=True, remove_pis=True)]
+
+
+def dumps(output):
+    """
+    This function writes an output as JSON text, so mapping types and views compare by content and order.
+    :param output: dict, Mapping or Exception,
+    :return: str.
+    """
+    assert not isinstance(output, Exception), output
+    return json.dumps(output, default=dict)
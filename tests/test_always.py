@@ -0,0 +1,59 @@
+import pytest
+
+from samples import SAMPLES, dumps
+import xml2js
+
+
+XML = '<r a="1"><b>t</b><b>u</b><c>v<!--k--></c><d/></r>'
+
+
+def convert(xml=XML, **options):
+    return xml2js.xml2json(xml, compact=True, header=False, **options)
+
+
+def test_always_array():
+    assert convert(always_array=True) == {'r': [{'_attributes': {'a': '1'}, 'b': [{'_text': ['t']}, {'_text': ['u']}],
+                                                 'c': [{'_text': ['v'], '_comment': ['k']}], 'd': [{}]}]}
+
+
+def test_always_array_keys():
+    assert convert(always_array={'c', 'd'}) == {'r': {'_attributes': {'a': '1'}, 'b': [{'_text': 't'}, {'_text': 'u'}],
+                                                      'c': [{'_text': 'v', '_comment': 'k'}], 'd': [{}]}}
+    assert convert(always_array=['_text']) == {'r': {'_attributes': {'a': '1'},
+                                                     'b': [{'_text': ['t']}, {'_text': ['u']}],
+                                                     'c': {'_text': ['v'], '_comment': 'k'}, 'd': {}}}
+
+
+@pytest.mark.parametrize('xml', [XML, '<r>t</r>', '<r/>'])
+def test_always_array_top(xml):
+    output = convert(xml, always_array={'r'})
+    assert output == {'r': [convert(xml)['r']]}
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('always_array', [True, {'_text', '_cdata', 'a'}])
+def test_always_array_engines(xml, always_array):
+    expected = dumps(xml2js.xml2json(xml, compact=True, always_array=always_array))
+    assert dumps(xml2js.xml2json(xml, compact=True, always_array=always_array, engine='recursive')) == expected
+
+
+def test_always_array_select():
+    assert convert(always_array=True, select=['r/c']) == \
+        {'r': [{'_attributes': {'a': '1'}, 'c': [{'_text': ['v'], '_comment': ['k']}]}]}
+    assert convert(always_array={'c'}, select=['r/c']) == \
+        {'r': {'_attributes': {'a': '1'}, 'c': [{'_text': 'v', '_comment': 'k'}]}}
+
+
+@pytest.mark.parametrize('engine', xml2js.CONVERT_ENGINES)
+def test_always_children(engine):
+    output = xml2js.xml2json('<r><d/><e>x</e></r>', header=False, always_children=True, engine=engine)
+    assert output == {'elements': [{'type': 'element', 'name': 'r', 'elements': [
+        {'type': 'element', 'name': 'd', 'elements': []},
+        {'type': 'element', 'name': 'e', 'elements': [{'type': 'text', 'text': 'x'}]}]}]}
+    assert xml2js.xml2json('<r/>', header=False, always_children=True, engine=engine) == \
+        {'elements': [{'type': 'element', 'name': 'r', 'elements': []}]}
+    assert 'elements' not in xml2js.xml2json('<r><d/></r>', header=False, engine=engine)['elements'][0]['elements'][0]
+
+
+def test_always_children_compact():
+    assert convert(always_children=True) == convert()
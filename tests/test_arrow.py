@@ -0,0 +1,74 @@
+from io import BytesIO
+
+import pytest
+
+import xml2js
+
+pyarrow = pytest.importorskip('pyarrow')
+
+
+def rows(xml, **options):
+    batches = list(xml2js.xml2arrow(BytesIO(xml), **options))
+    return batches[0].schema, [row for batch in batches for row in batch.to_pylist()]
+
+
+def test_list_promotion():
+    schema, table = rows(b'<r><p><n>a</n><n>b</n></p><p><n>c</n></p><p/></r>', sample_size=1)
+    assert schema.field('n._text').type == pyarrow.list_(pyarrow.string())
+    assert table == [{'n._text': ['a', 'b']}, {'n._text': ['c']}, {'n._text': None}]
+
+
+def test_string_fallback():
+    xml = b'<r><p><v>x</v></p><p><v>2</v></p><p><v>true</v><w>1</w></p></r>'
+    schema, table = rows(xml, sample_size=1, native_type=True)
+    assert schema.names == ['v._text']
+    assert table == [{'v._text': 'x'}, {'v._text': '2'}, {'v._text': 'true'}]
+
+
+def test_native_columns():
+    xml = b'<r><p id="1"><v>1.5</v><b>true</b></p><p id="2"><v>2</v><b>false</b></p></r>'
+    schema, table = rows(xml, native_type=True, native_type_attributes=True)
+    assert [field.type for field in schema] == [pyarrow.int64(), pyarrow.float64(), pyarrow.bool_()]
+    assert table == [{'_attributes.id': 1, 'v._text': 1.5, 'b._text': True},
+                     {'_attributes.id': 2, 'v._text': 2.0, 'b._text': False}]
+
+
+def test_integer_truncation():
+    with pytest.raises(ValueError, match="'v._text'.*int64.*truncated"):
+        rows(b'<r><p><v>1</v></p><p><v>2.5</v></p></r>', sample_size=1, native_type=True)
+
+
+def test_repeated_after_sample():
+    with pytest.raises(ValueError) as error_info:
+        rows(b'<r><p><n>a</n></p><p><n>b</n><n>c</n></p></r>', sample_size=1)
+    assert str(error_info.value).startswith("The column 'n._text' has values that do not fit its type string")
+    assert 'sample_size' in str(error_info.value)
+
+
+def test_schema():
+    schema = pyarrow.schema([pyarrow.field('v._text', pyarrow.string())])
+    assert rows(b'<r><p><v>1</v><w>2</w></p></r>', schema=schema) == (schema, [{'v._text': '1'}])
+
+
+def test_parquet_row_groups(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    xml = b'<r>' + b''.join(b'<p id="%d"><v>%d</v></p>' % (index, index) for index in range(5)) + b'</r>'
+    path = tmp_path / 'out.parquet'
+    assert xml2js.xml2arrow_file(BytesIO(xml), str(path), batch_size=2) == 5
+    metadata = parquet.ParquetFile(path).metadata
+    assert [metadata.row_group(index).num_rows for index in range(metadata.num_row_groups)] == [2, 2, 1]
+    assert parquet.read_table(path).to_pylist() == rows(xml)[1]
+
+
+def test_feather(tmp_path):
+    feather = pytest.importorskip('pyarrow.feather')
+    xml = b'<r><p><v>a</v></p><p><v>b</v></p></r>'
+    path = tmp_path / 'out.feather'
+    assert xml2js.xml2arrow_file(BytesIO(xml), str(path), file_format='feather') == 2
+    assert feather.read_table(path).to_pylist() == [{'v._text': 'a'}, {'v._text': 'b'}]
+
+
+def test_file_errors(tmp_path):
+    with pytest.raises(ValueError):
+        xml2js.xml2arrow_file(BytesIO(b'<r><p/></r>'), str(tmp_path / 'out'), file_format='csv')
+    assert xml2js.xml2arrow_file(BytesIO(b'<r/>'), str(tmp_path / 'out.parquet')) == 0
@@ -0,0 +1,69 @@
+import asyncio
+import mmap
+import pathlib
+
+import pytest
+
+from samples import SAMPLES, dumps
+import xml2js
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('options', [dict(), dict(compact=True), dict(engine='recursive', strip_cdata=True)])
+def test_async(xml, options):
+    expected = dumps(xml2js.xml2json(xml, **options))
+    assert dumps(asyncio.run(xml2js.xml2json_async(xml, **options))) == expected
+    assert dumps(asyncio.run(xml2js.xml2json_async(xml, slice_size=7, chunk_size=64, **options))) == expected
+
+
+@pytest.mark.parametrize('wrap', [bytearray, memoryview, pathlib.Path])
+def test_sliced_inputs(tmp_path, wrap):
+    xml = SAMPLES[2]
+    path = tmp_path / 'doc.xml'
+    path.write_bytes(xml)
+    source = path if wrap is pathlib.Path else wrap(xml)
+    output = asyncio.run(xml2js.xml2json_async(source, slice_size=3, chunk_size=16, compact=True))
+    assert output == xml2js.xml2json(xml, compact=True)
+
+
+def test_sliced_mmap(tmp_path):
+    path = tmp_path / 'doc.xml'
+    path.write_bytes(SAMPLES[3])
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        output = asyncio.run(xml2js.xml2json_async(data, slice_size=3, chunk_size=16))
+    assert output == xml2js.xml2json(SAMPLES[3])
+
+
+def test_sliced_select_and_lazy():
+    xml = SAMPLES[3]
+    selected = asyncio.run(xml2js.xml2json_async(xml, slice_size=2, select=['root/item/name'], compact=True))
+    assert selected == xml2js.xml2json(xml, select=['root/item/name'], compact=True)
+    view = asyncio.run(xml2js.xml2json_async(xml, slice_size=2, lazy=True, compact=True))
+    assert dumps(view) == dumps(xml2js.xml2json(xml, compact=True))
+
+
+def test_sliced_errors():
+    assert isinstance(asyncio.run(xml2js.xml2json_async('<a/>', slice_size=2, text_engine='other')), Exception)
+    with pytest.raises(ValueError):
+        asyncio.run(xml2js.xml2json_async('<a/>', slice_size=2, text_engine='other', errors='strict'))
+    with pytest.raises(ValueError):
+        asyncio.run(xml2js.xml2json_async('<a/>', slice_size=2, engine='other'))
+    with pytest.raises(xml2js.etree.XMLSyntaxError):
+        asyncio.run(xml2js.xml2json_async('<a>', slice_size=2))
+
+
+def test_sliced_yields_to_loop():
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.ensure_future(ticker())
+        output = await xml2js.xml2json_async(SAMPLES[-1], slice_size=5, chunk_size=256)
+        task.cancel()
+        return output
+    assert asyncio.run(main()) == xml2js.xml2json(SAMPLES[-1])
+    assert len(ticks) > 10
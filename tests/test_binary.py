@@ -0,0 +1,40 @@
+import pytest
+
+from samples import SAMPLES, SHAPES, dumps
+import xml2js
+
+
+# cbor2 decodes at most 400 nested containers, so the deep shape is taken at a smaller depth.
+BINARY_SAMPLES = [sample for sample in SAMPLES if sample != SHAPES['deep'](4096)] + [SHAPES['deep'](4096, depth=50)]
+
+
+def decode(data, binary_format):
+    if binary_format == 'msgpack':
+        return pytest.importorskip('msgpack').unpackb(data, strict_map_key=False)
+    return pytest.importorskip('cbor2').loads(data)
+
+
+@pytest.mark.parametrize('xml', BINARY_SAMPLES)
+@pytest.mark.parametrize('compact', [True, False])
+@pytest.mark.parametrize('binary_format', xml2js.BINARY_FORMATS)
+@pytest.mark.parametrize('key_table', [False, True])
+def test_binary(xml, compact, binary_format, key_table):
+    data = xml2js.xml2json_binary(xml, compact=compact, binary_format=binary_format, key_table=key_table)
+    output = decode(data, binary_format)
+    if key_table:
+        output = xml2js.restorekeys(output, compact)
+    assert dumps(output) == dumps(xml2js.xml2json(xml, compact=compact))
+
+
+@pytest.mark.parametrize('binary_format', xml2js.BINARY_FORMATS)
+def test_key_table(binary_format):
+    xml = b'<r><item id="1">a</item><item id="2">b</item></r>'
+    data = decode(xml2js.xml2json_binary(xml, compact=True, header=False, binary_format=binary_format,
+                                         key_table=True), binary_format)
+    assert sorted(data[0]) == ['_attributes', '_text', 'id', 'item', 'r']
+    assert xml2js.restorekeys(data, True) == xml2js.xml2json(xml, compact=True, header=False)
+
+
+def test_binary_format():
+    with pytest.raises(ValueError):
+        xml2js.xml2json_binary('<a/>', binary_format='bson')
@@ -0,0 +1,77 @@
+import bz2
+import gzip
+import io
+import json
+import lzma
+import sys
+
+import pytest
+
+from samples import SHAPES
+import xml2js
+
+
+XML = SHAPES['mixed'](16384)
+DEEP = b'<r><a>' + b'<d>' * 300 + b'x' + b'</d>' * 300 + b'</a><a/></r>'
+
+
+def run(tmp_path, *args, xml=XML):
+    path = tmp_path / 'doc.xml'
+    path.write_bytes(xml)
+    output = tmp_path / 'out.jsonl'
+    status = xml2js.main([str(path), '-o', str(output)] + list(args))
+    return status, output.read_bytes().splitlines()
+
+
+@pytest.mark.parametrize('compress', [gzip.compress, bz2.compress, lzma.compress])
+def test_compressed(tmp_path, compress):
+    assert run(tmp_path, xml=compress(XML)) == run(tmp_path)
+
+
+def test_lines(tmp_path):
+    status, lines = run(tmp_path, '-c')
+    root = xml2js.parsexml(XML)
+    assert status == 0
+    assert [json.loads(line) for line in lines] == \
+        [xml2js.walkelement(record, header=False, compact=True) for record in root.iterchildren()]
+
+
+def test_stdin_stdout(monkeypatch, capsysbinary):
+    stdin = io.BufferedReader(io.BytesIO(gzip.compress(b'<r><a>1</a><a>2</a></r>')))
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(stdin))
+    assert xml2js.main(['-c']) == 0
+    assert capsysbinary.readouterr().out == b'{"a": {"_text": "1"}}\n{"a": {"_text": "2"}}\n'
+
+
+@pytest.mark.parametrize('jobs', ['0', '2'])
+def test_jobs_order(tmp_path, jobs):
+    assert run(tmp_path, '-j', jobs, '--chunksize', '3') == run(tmp_path)
+
+
+def test_jobs_huge_tree(tmp_path):
+    status, lines = run(tmp_path, '-j', '2', '--huge-tree', xml=DEEP)
+    assert status == 0
+    assert (status, lines) == run(tmp_path, '--huge-tree', xml=DEEP)
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_bad_input(tmp_path, capsys, jobs):
+    status, lines = run(tmp_path, '-j', jobs, xml=b'<r><a>1</a><a>2</b></r>')
+    assert status == 1
+    assert capsys.readouterr().err.startswith('xml2js: ')
+
+
+def test_worker_failure(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(xml2js, 'xml2json_many', lambda records, **options: iter(
+        ['{}', xml2js.ConversionError('XMLSyntaxError: bad', None, 1, 1)]))
+    status, lines = run(tmp_path, '-j', '2')
+    assert (status, lines) == (1, [b'{}'])
+    assert capsys.readouterr().err == 'xml2js: XMLSyntaxError: bad (document 1, line 1)\n'
+
+
+@pytest.mark.parametrize('name', ['missing.xml', '.'])
+def test_unreadable(tmp_path, capsys, name):
+    with pytest.raises(SystemExit) as exit_info:
+        xml2js.main([str(tmp_path / name)])
+    assert exit_info.value.code == 2
+    assert "can't open" in capsys.readouterr().err
@@ -0,0 +1,30 @@
+import pytest
+
+from samples import SAMPLES, dumps
+import xml2js
+
+
+SCHEMA = b'''<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:element name="r">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element name="a" type="xs:string" maxOccurs="unbounded"/>
+        <xs:element name="b" type="xs:string"/>
+      </xs:sequence>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>'''
+
+
+@pytest.mark.parametrize('options', [dict(), dict(strip_cdata=True), dict(remove_blank_text=False),
+                                     dict(header=False), dict(remove_comments=True)])
+def test_compiled(options):
+    converter = xml2js.compile_converter(SAMPLES[:5], **options)
+    for xml in SAMPLES:
+        assert dumps(converter(xml)) == dumps(xml2js.xml2json(xml, compact=True, **options))
+
+
+@pytest.mark.parametrize('xml', [b'<r><a>1</a><a>2</a><b>3</b></r>', b'<r><a>1</a><b>3</b><c/></r>', b'<s/>'])
+def test_compiled_schema(xml):
+    converter = xml2js.compile_converter(SCHEMA)
+    assert dumps(converter(xml)) == dumps(xml2js.xml2json(xml, compact=True))
@@ -0,0 +1,27 @@
+from collections import OrderedDict
+
+import pytest
+
+from samples import SAMPLES, dumps
+import xml2js
+
+
+def types(output):
+    if isinstance(output, dict):
+        yield type(output)
+        for value in output.values():
+            yield from types(value)
+    elif isinstance(output, list):
+        for value in output:
+            yield from types(value)
+
+
+@pytest.mark.parametrize('engine', xml2js.CONVERT_ENGINES)
+@pytest.mark.parametrize('compact', [True, False])
+def test_dict_type(engine, compact):
+    for xml in SAMPLES:
+        output = xml2js.xml2json(xml, engine=engine, compact=compact)
+        ordered = xml2js.xml2json(xml, engine=engine, compact=compact, dict_type=OrderedDict)
+        assert set(types(output)) == {dict}
+        assert set(types(ordered)) == {OrderedDict}
+        assert dumps(ordered) == dumps(output)
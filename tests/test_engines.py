@@ -0,0 +1,37 @@
+import pytest
+
+from samples import OPTIONS, SAMPLES, dumps
+import xml2js
+
+DEEP = b'<root>' + b'<node id="1">text' * 2000 + b'</node>' * 2000 + b'</root>'
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('options', OPTIONS)
+def test_convert_engines(xml, options):
+    assert dumps(xml2js.xml2json(xml, engine='recursive', **options)) == dumps(xml2js.xml2json(xml, **options))
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        xml2js.xml2json('<a/>', engine='other')
+
+
+def test_depth_limit_without_huge_tree():
+    with pytest.raises(xml2js.etree.XMLSyntaxError):
+        xml2js.xml2json(DEEP)
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_iterative_beyond_recursion_limit(compact):
+    output = xml2js.xml2json(DEEP, compact=compact, huge_tree=True)
+    node = output['root'] if compact else output['elements'][0]
+    depth = 0
+    while node:
+        depth += 1
+        if compact:
+            node = node.get('node')
+        else:
+            node = next((child for child in node.get('elements', []) if child['type'] == 'element'), None)
+    assert depth == 2001
+    assert isinstance(xml2js.xml2json(DEEP, compact=compact, huge_tree=True, engine='recursive'), Exception)
@@ -0,0 +1,66 @@
+import pytest
+
+import xml2js
+
+
+XML = '<r>\n<a>1</a>\n<bad><x>2</x></bad>\n<b><bad><y/></bad>3</b>\n</r>'
+
+
+@pytest.fixture(autouse=True)
+def failing(monkeypatch):
+    # Converting a <bad> element fails in both engines; they read its text only when it has children.
+    textnodes = xml2js.textnodes
+
+    def failing(element, *args):
+        if element.tag == 'bad':
+            raise RuntimeError('bad element')
+        return textnodes(element, *args)
+
+    monkeypatch.setattr(xml2js, 'textnodes', failing)
+
+
+@pytest.mark.parametrize('engine', xml2js.CONVERT_ENGINES)
+def test_return(engine):
+    output = xml2js.xml2json(XML, engine=engine)
+    assert isinstance(output, Exception) and str(output) == 'bad element'
+
+
+@pytest.mark.parametrize('engine', xml2js.CONVERT_ENGINES)
+def test_strict(engine):
+    with pytest.raises(xml2js.ConversionError) as error_info:
+        xml2js.xml2json(XML, engine=engine, errors='strict')
+    error = error_info.value
+    assert (error.message, error.path, error.line) == ('RuntimeError: bad element', '/r/bad', 3)
+    assert str(error) == 'RuntimeError: bad element (element /r/bad, line 3)'
+    assert isinstance(error.__cause__, RuntimeError)
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_collect(compact):
+    errors = []
+    output = xml2js.xml2json(XML, compact=compact, header=False, errors=errors)
+    assert [(error.path, error.line) for error in errors] == [('/r/bad', 3), ('/r/b/bad', 4)]
+    # The failed subtrees are left out and the walk resumes with the next element.
+    expected = xml2js.xml2json('<r><a>1</a><b>3</b></r>', compact=compact, header=False)
+    assert output == expected
+
+
+def test_recursive_collect(monkeypatch):
+    calls = []
+    walkelement = xml2js.walkelement
+
+    def spy(*args, **kwargs):
+        calls.append(args[0].tag)
+        return walkelement(*args, **kwargs)
+
+    monkeypatch.setattr(xml2js, 'walkelement', spy)
+    errors = []
+    assert xml2js.xml2json(XML, engine='recursive', errors=errors) == xml2js.xml2json(XML, errors=[])
+    assert calls == ['r', 'r'] and len(errors) == 2
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        xml2js.xml2json(XML, errors='ignore')
+    with pytest.raises(ValueError):
+        xml2js.xml2json(XML, engine='recursive', errors='ignore')
@@ -0,0 +1,45 @@
+import pytest
+
+from samples import SHAPES, dumps
+import xml2js
+
+
+def feed(converter, data, size):
+    records = []
+    for start in range(0, len(data), size):
+        records.extend(converter.feed(data[start:start + size]))
+    return records + converter.close()
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64, 4096])
+@pytest.mark.parametrize('compact', [True, False])
+def test_chunk_boundaries(size, compact):
+    xml = SHAPES['mixed'](8192)
+    expected = [dumps(xml2js.walkelement(record, header=False, compact=compact))
+                for record in xml2js.parsexml(xml).iterchildren()]
+    assert [dumps(record) for record in feed(xml2js.FeedConverter(compact=compact), xml, size)] == expected
+
+
+def test_records_as_chunks_complete():
+    converter = xml2js.FeedConverter(compact=True)
+    assert converter.feed(b'<r><a>1</a><a') == [{'a': {'_text': '1'}}]
+    assert converter.feed(b'>2</') == []
+    assert converter.feed(b'a></r>') == [{'a': {'_text': '2'}}]
+    assert converter.close() == []
+
+
+def test_tag_path():
+    xml = b'<r><a><i>1</i></a><b><i>2</i></b><a><i>3</i><i>4</i></a></r>'
+    records = feed(xml2js.FeedConverter('r/a/i', compact=True), xml, 5)
+    assert records == [{'i': {'_text': '1'}}, {'i': {'_text': '3'}}, {'i': {'_text': '4'}}]
+
+
+def test_close_incomplete():
+    converter = xml2js.FeedConverter(compact=True)
+    assert converter.feed(b'<r><a>1</a><a>2') == [{'a': {'_text': '1'}}]
+    with pytest.raises(xml2js.etree.XMLSyntaxError):
+        converter.close()
+
+
+def test_str_chunks():
+    assert feed(xml2js.FeedConverter('a', compact=True), '<r><a>é</a></r>', 2) == [{'a': {'_text': 'é'}}]
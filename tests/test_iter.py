@@ -0,0 +1,30 @@
+from io import BytesIO
+
+import pytest
+
+from samples import SHAPES, dumps
+import xml2js
+
+
+@pytest.mark.parametrize('shape', sorted(SHAPES))
+@pytest.mark.parametrize('compact', [True, False])
+def test_iter(shape, compact):
+    xml = SHAPES[shape](16384)
+    root = xml2js.parsexml(xml)
+    tag = root[0].tag
+    expected = [dumps(xml2js.walkelement(record, header=False, compact=compact)) for record in root.iterchildren(tag)]
+    records = xml2js.xml2json_iter(BytesIO(xml), tag, compact=compact)
+    assert [dumps(record) for record in records] == expected
+
+
+def test_iter_path(tmp_path):
+    path = tmp_path / 'doc.xml'
+    path.write_bytes(b'<r><a><i>1</i></a><b><i>2</i></b><a><i>3</i></a></r>')
+    records = list(xml2js.xml2json_iter(str(path), 'r/a/i', compact=True))
+    assert records == [{'i': {'_text': '1'}}, {'i': {'_text': '3'}}]
+
+
+def test_iter_nested_records():
+    xml = b'<r><p><v>1</v><p><v>2</v></p></p><p><v>3</v></p></r>'
+    records = list(xml2js.xml2json_iter(BytesIO(xml), 'p', compact=True))
+    assert records == [{'p': {'v': {'_text': '1'}, 'p': {'v': {'_text': '2'}}}}, {'p': {'v': {'_text': '3'}}}]
@@ -0,0 +1,66 @@
+from io import BytesIO
+
+import pytest
+
+from samples import SAMPLES, SHAPES, dumps
+import xml2js
+
+
+# Documents without text mixed with children; xml-js output lists an element's texts before its children.
+UNMIXED = [SAMPLES[index] for index in (0, 1, 3, 5, 6, 7, 9)] + [SHAPES[shape](4096) for shape in ('wide', 'deep')]
+
+
+def roundtrip(output, compact, header):
+    return xml2js.xml2json(xml2js.json2xml(output, compact=compact), compact=compact, header=header)
+
+
+@pytest.mark.parametrize('xml', UNMIXED)
+@pytest.mark.parametrize('compact', [True, False])
+@pytest.mark.parametrize('header', [True, False])
+def test_round_trip(xml, compact, header):
+    output = xml2js.xml2json(xml, compact=compact, header=header)
+    assert dumps(roundtrip(output, compact, header)) == dumps(output)
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('compact', [True, False])
+def test_round_trip_is_stable(xml, compact):
+    output = roundtrip(xml2js.xml2json(xml, compact=compact), compact, True)
+    assert dumps(roundtrip(output, compact, True)) == dumps(output)
+
+
+def test_declaration_encoding():
+    output = xml2js.xml2json('<a>é</a>'.encode('utf-8'), compact=True)
+    data = xml2js.json2xml(output, compact=True)
+    assert data.startswith(b"<?xml version='1.0' encoding='ISO-8859-1'?>") and 'é'.encode('latin-1') in data
+    assert xml2js.json2xml(output, compact=True, encoding='utf-8').endswith('<a>é</a>'.encode('utf-8'))
+    assert xml2js.json2xml(xml2js.xml2json('<a/>', header=False)) == b'<a></a>'
+
+
+def test_generators_and_scalars():
+    def items():
+        for index in range(3):
+            yield {'_attributes': {'n': index}, '_text': index % 2 == 0}
+    data = {'r': {'i': items(), 'empty': None, 'n': 1.5}}
+    assert xml2js.json2xml(data, compact=True) == \
+        b'<r><i n="0">true</i><i n="1">false</i><i n="2">true</i><empty></empty><n>1.5</n></r>'
+    nodes = ({'type': 'element', 'name': 'i', 'elements': iter([{'type': 'text', 'text': str(index)}])}
+             for index in range(2))
+    data = {'elements': [{'type': 'element', 'name': 'r', 'elements': nodes}]}
+    assert xml2js.json2xml(data) == b'<r><i>0</i><i>1</i></r>'
+
+
+def test_output_stream_and_path(tmp_path):
+    output = xml2js.xml2json(SAMPLES[3], compact=True)
+    expected = xml2js.json2xml(output, compact=True)
+    stream = BytesIO()
+    assert xml2js.json2xml(output, stream, compact=True) is None
+    assert stream.getvalue() == expected
+    path = tmp_path / 'out.xml'
+    xml2js.json2xml(output, str(path), compact=True)
+    assert path.read_bytes() == expected
+
+
+def test_unknown_node_type():
+    with pytest.raises(ValueError, match="'other'"):
+        xml2js.json2xml({'elements': [{'type': 'other'}]})
@@ -0,0 +1,27 @@
+import pytest
+
+from samples import SAMPLES, dumps
+import xml2js
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('options', [dict(), dict(strip_cdata=True), dict(remove_blank_text=False),
+                                     dict(header=False)])
+def test_lazy(xml, options):
+    expected = dumps(xml2js.xml2json(xml, compact=True, **options))
+    assert dumps(xml2js.xml2json(xml, compact=True, lazy=True, **options)) == expected
+
+
+def test_lazy_view_is_read_only():
+    view = xml2js.xml2json('<r><a>1</a></r>', compact=True, lazy=True, header=False)
+    assert isinstance(view['r'], xml2js.CompactView)
+    assert view['r']['a']['_text'] == '1'
+    with pytest.raises(TypeError):
+        view['r'] = {}
+
+
+@pytest.mark.parametrize('options', [dict(compact=False), dict(compact=True, native_type=True),
+                                     dict(compact=True, always_array=True)])
+def test_lazy_unsupported(options):
+    with pytest.raises(ValueError):
+        xml2js.xml2json('<r/>', lazy=True, **options)
@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from samples import SAMPLES, dumps
+import xml2js
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('compact', [True, False])
+def test_limits(xml, compact):
+    output = xml2js.xml2json(xml, compact=compact, max_depth=2, max_children=3)
+    assert json.loads(dumps(output)) == json.loads(dumps(xml2js.xml2json(xml, compact=compact)))
+
+
+def test_lazy_nodes():
+    output = xml2js.xml2json('<r><a><b>1</b></a><c/><d/></r>', compact=True, header=False, max_depth=2,
+                             max_children=1)
+    assert isinstance(output['r']['a']['b'], xml2js.LazyNode)
+    assert isinstance(output['r']['c'], xml2js.LazyNode) and isinstance(output['r']['d'], xml2js.LazyNode)
+    node = output['r']['a']['b']
+    assert node.element is not None
+    assert node['_text'] == '1'
+    assert node.element is None
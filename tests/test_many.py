@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from samples import SAMPLES, dumps
+import xml2js
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_many(compact):
+    outputs = list(xml2js.xml2json_many(SAMPLES, workers=2, chunksize=3, compact=compact))
+    assert [dumps(output) for output in outputs] == [dumps(xml2js.xml2json(xml, compact=compact)) for xml in SAMPLES]
+
+
+def test_many_unordered_serialized():
+    outputs = dict(xml2js.xml2json_many(SAMPLES, workers=2, chunksize=2, ordered=False, serialize=True))
+    assert [outputs[index] for index in range(len(SAMPLES))] == [xml2js.xml2json_string(xml) for xml in SAMPLES]
+
+
+@pytest.mark.parametrize('serialize', [False, True])
+def test_many_malformed_document(serialize):
+    outputs = list(xml2js.xml2json_many([b'<a/>', b'<a>', b'<b>x</b>'], workers=1, serialize=serialize))
+    error = outputs[1]
+    assert isinstance(error, xml2js.ConversionError)
+    assert error.message.startswith('XMLSyntaxError') and error.line == 1 and error.index == 1
+    assert 'document 1' in str(error)
+    expected = xml2js.xml2json(b'<b>x</b>')
+    assert outputs[2] == (json.dumps(expected) if serialize else expected)
+
+
+def test_many_chunksize():
+    with pytest.raises(ValueError):
+        list(xml2js.xml2json_many(SAMPLES, chunksize=0))
@@ -0,0 +1,49 @@
+import xml2js
+
+
+XML = '<r><item key="1"><name>a</name></item><item key="2"><name>b</name></item></r>'
+
+
+def names(record):
+    # The tag and attribute name strings of a compact <item> node.
+    return [key for key in record if not key.startswith('_')] + list(record['_attributes'])
+
+
+def test_shared_within_document():
+    first, second = xml2js.xml2json(XML, compact=True)['r']['item']
+    assert all(map(lambda a, b: a is b, names(first), names(second)))
+
+
+def test_shared_across_records():
+    table = xml2js.NameTable()
+    root = xml2js.parsexml(XML)
+    first, second = [xml2js.walkelement(record, header=False, compact=True, names=table) for record in root]
+    assert next(iter(first)) is next(iter(second)) is table['item']
+    assert all(map(lambda a, b: a is b, names(first['item']), names(second['item'])))
+    recursive = xml2js.parseelement(root[0], header=False, compact=True, names=table)
+    assert next(iter(recursive)) is table['item']
+
+
+def test_max_size():
+    table = xml2js.NameTable(max_size=2)
+    assert table['a'] == 'a' and table['b'] == 'b'
+    name = ''.join(['na', 'me'])
+    assert table[name] is name and 'name' not in table
+    assert len(table) == 2
+
+
+def test_no_interning():
+    first, second = xml2js.xml2json(XML, compact=True, names=False)['r']['item']
+    assert names(first) == names(second) == ['name', 'key']
+    assert not any(map(lambda a, b: a is b, names(first), names(second)))
+
+
+def test_partition(monkeypatch):
+    monkeypatch.setattr(xml2js, 'WORKER_STATE', {})
+    options = dict(strip_cdata=False, remove_comments=False, remove_pis=False, compact=True, remove_blank_text=True,
+                   text_engine='single_pass', huge_tree=False, dict_type=dict)
+    xml2js._initpartition(options, b'<r>', b'</r>', None)
+    tag, attributes, texts, children = xml2js._convertpartition(XML.encode()[3:-4])
+    (first_key, first), (second_key, second) = children
+    assert first_key is second_key
+    assert all(map(lambda a, b: a is b, names(first), names(second)))
@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pytest
+
+import xml2js
+
+
+XML = '<a x="1" y="-2.5e1" z="TRUE" w="one"><b>007</b><c>.5</c><d>False</d><e>1 2</e><f>١٢</f></a>'
+
+
+def convert(xml=XML, **options):
+    return xml2js.xml2json(xml, compact=True, header=False, **options)['a']
+
+
+def texts(node):
+    return {key: value['_text'] for key, value in node.items() if key != '_attributes'}
+
+
+@pytest.mark.parametrize('engine', xml2js.CONVERT_ENGINES)
+def test_native_type(engine):
+    node = convert(native_type=True, engine=engine)
+    assert texts(node) == {'b': 7, 'c': 0.5, 'd': False, 'e': '1 2', 'f': '١٢'}
+    assert node['_attributes'] == {'x': '1', 'y': '-2.5e1', 'z': 'TRUE', 'w': 'one'}
+
+
+def test_native_type_attributes():
+    node = convert(native_type_attributes=True)
+    assert node['_attributes'] == {'x': 1, 'y': -25.0, 'z': True, 'w': 'one'}
+    assert texts(node)['b'] == '007'
+
+
+def test_non_compact():
+    output = xml2js.xml2json('<a n="1"><b>2</b>3<![CDATA[4]]></a>', header=False, native_type=True,
+                             native_type_attributes=True)
+    assert output['elements'][0]['attributes'] == {'n': 1}
+    assert output['elements'][0]['elements'] == [{'type': 'text', 'text': 3}, {'type': 'cdata', 'cdata': '4'},
+                                                 {'type': 'element', 'name': 'b',
+                                                  'elements': [{'type': 'text', 'text': 2}]}]
+
+
+@pytest.mark.parametrize('numeric_types, expected', [
+    ((int, float), {'b': 7, 'c': 0.5}),
+    ((Decimal,), {'b': Decimal('7'), 'c': Decimal('0.5')}),
+    ((int, Decimal), {'b': 7, 'c': Decimal('0.5')}),
+    ((int,), {'b': 7, 'c': '.5'}),
+    ((), {'b': '007', 'c': '.5'}),
+])
+def test_numeric_types(numeric_types, expected):
+    node = texts(convert(native_type=True, numeric_types=numeric_types))
+    assert {key: node[key] for key in expected} == expected
+    assert type(node['b']) is type(expected['b'])
+    assert node['d'] is False
+
+
+@pytest.mark.parametrize('errors', ['return', []])
+def test_long_numerals(errors):
+    numeral = '1' * 5000
+    assert texts(convert(f'<a><b>{numeral}</b></a>', native_type=True, errors=errors)) == {'b': float(numeral)}
+    assert texts(convert(f'<a><b>{numeral}</b></a>', native_type=True, numeric_types=(int,), errors=errors)) == \
+        {'b': numeral}
+    assert texts(convert(f'<a><b>{numeral}</b></a>', native_type=True, numeric_types=(int, Decimal),
+                         errors=errors)) == {'b': Decimal(numeral)}
@@ -0,0 +1,43 @@
+import mmap
+
+import pytest
+
+from samples import SHAPES, dumps
+import xml2js
+
+
+XML = SHAPES['wide'](65536)
+
+
+@pytest.mark.parametrize('shape', ['wide', 'cdata', 'mixed'])
+@pytest.mark.parametrize('options', [dict(), dict(compact=True), dict(header=False, text_engine='tostring')])
+def test_parallel(shape, options):
+    xml = SHAPES[shape](65536)
+    expected = dumps(xml2js.xml2json(xml, **options))
+    assert dumps(xml2js.xml2json_parallel(xml, workers=2, partitions=3, **options)) == expected
+
+
+@pytest.mark.parametrize('source', [bytearray, memoryview])
+def test_parallel_buffers(source):
+    expected = dumps(xml2js.xml2json(XML, compact=True))
+    assert dumps(xml2js.xml2json_parallel(source(XML), workers=2, partitions=3, compact=True)) == expected
+
+
+def test_parallel_files(tmp_path):
+    path = tmp_path / 'doc.xml'
+    path.write_bytes(XML)
+    expected = dumps(xml2js.xml2json(XML))
+    assert dumps(xml2js.xml2json_parallel(path, workers=2, partitions=3)) == expected
+    assert dumps(xml2js.xml2json_parallel(str(path), workers=2, partitions=3)) == expected
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        assert dumps(xml2js.xml2json_parallel(data, workers=2, partitions=3)) == expected
+
+
+def test_parallel_fallback():
+    xml = b'<r><a>1</a><!-- <a> --><a>2</a><a>3</a></r>'
+    assert dumps(xml2js.xml2json_parallel(bytearray(xml), workers=2, partitions=3)) == dumps(xml2js.xml2json(xml))
+
+
+def test_parallel_type():
+    with pytest.raises(TypeError, match='list'):
+        xml2js.xml2json_parallel([XML])
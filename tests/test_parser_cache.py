@@ -0,0 +1,44 @@
+import threading
+
+import xml2js
+
+
+def test_hits_and_misses_per_options():
+    xml2js.clear_parser_cache()
+    xml2js.xml2json('<a/>')
+    xml2js.xml2json('<a/>')
+    xml2js.xml2json('<a/>', remove_comments=True)
+    info = xml2js.parser_cache_info()
+    assert info['misses'] == 2 and info['hits'] == 1
+    assert len(info['parsers']) == 2
+    assert dict(info['parsers'][1])['remove_comments'] is True
+    assert xml2js.cachedparser(remove_comments=True, remove_pis=False, strip_cdata=False, huge_tree=False) is \
+        xml2js.cachedparser(remove_comments=True, remove_pis=False, strip_cdata=False, huge_tree=False)
+
+
+def test_per_thread():
+    xml2js.clear_parser_cache()
+    parser = xml2js.cachedparser(strip_cdata=False)
+    seen = {}
+
+    def other():
+        seen['parser'] = xml2js.cachedparser(strip_cdata=False)
+        seen['info'] = xml2js.parser_cache_info()
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+    assert seen['parser'] is not parser
+    assert seen['info']['misses'] == 1 and seen['info']['hits'] == 0
+    assert xml2js.parser_cache_info()['misses'] == 1
+
+
+def test_clear():
+    xml2js.xml2json('<a/>')
+    xml2js.clear_parser_cache()
+    assert xml2js.parser_cache_info() == dict(parsers=[], hits=0, misses=0)
+
+
+def test_explicit_parser_bypasses_cache():
+    xml2js.clear_parser_cache()
+    xml2js.xml2json('<a/>', parser=xml2js.XMLParser())
+    assert xml2js.parser_cache_info()['misses'] == 0
@@ -0,0 +1,84 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import xml2js
+
+
+XML = '<r a="1"><b x="1" y="2">t</b><b>u</b><!--c--><d/></r>'
+
+
+def test_stages():
+    with xml2js.Profiler() as profiler:
+        xml2js.xml2json(XML, compact=True)
+    stats = profiler.stats()
+    calls = {stage: values['calls'] for stage, values in stats['stages'].items()}
+    assert calls == dict(parse=1, cdata=1, text=4, leaf=1, build=1, serialize=0)
+    assert stats['bytes_serialized'] == 0
+    assert xml2js.PROFILER is None
+
+
+def test_tags():
+    with xml2js.Profiler() as profiler:
+        xml2js.xml2json(XML, compact=True)
+    stats = profiler.stats()
+    assert {tag: (values['elements'], values['attributes'], values['lists_promoted'])
+            for tag, values in stats['tags'].items()} == {'r': (1, 1, 0), 'b': (2, 2, 1), 'd': (1, 0, 0)}
+    assert (stats['elements'], stats['lists_promoted']) == (4, 1)
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_serialize(binary):
+    root = xml2js.parsexml('<r><b>é</b></r>')
+    with xml2js.Profiler() as profiler:
+        output = xml2js.dumpbinary(root) if binary else xml2js.dumpelement(root, ensure_ascii=False)
+    stats = profiler.stats()
+    assert stats['stages']['serialize']['calls'] == 1
+    assert stats['bytes_serialized'] == len(output if binary else output.encode('utf-8'))
+
+
+def test_threads():
+    with xml2js.Profiler() as profiler:
+        thread = threading.Thread(target=xml2js.xml2json, args=(XML,))
+        thread.start()
+        thread.join()
+    assert profiler.stats()['elements'] == 0
+    assert all(values['calls'] == 0 for values in profiler.stats()['stages'].values())
+
+
+def test_exclusive_times(monkeypatch):
+    clock = iter([0.0, 1.0, 3.0, 6.0])
+    monkeypatch.setattr(xml2js, 'time', SimpleNamespace(perf_counter=lambda: next(clock)))
+    profiler = xml2js.Profiler()
+    profiler.thread = threading.get_ident()
+    outer = profiler.begin('build')
+    profiler.end(profiler.begin('text'))
+    profiler.end(outer)
+    assert profiler.stages['text'] == [2.0, 1]
+    assert profiler.stages['build'] == [4.0, 1]
+
+
+def test_one_active():
+    results = []
+    with xml2js.Profiler(callback=results.append):
+        with pytest.raises(RuntimeError):
+            with xml2js.Profiler():
+                pass
+        xml2js.xml2json('<a/>')
+    assert results[0]['elements'] == 1
+    with xml2js.Profiler() as profiler:
+        xml2js.xml2json('<a/>')
+    assert profiler.stats()['elements'] == 1
+
+
+def test_prometheus():
+    with xml2js.Profiler() as profiler:
+        xml2js.xml2json_string('<r><b>1</b><q:c xmlns:q="u"/></r>')
+    lines = profiler.prometheus(prefix='test').splitlines()
+    assert '# TYPE test_stage_calls_total counter' in lines
+    assert 'test_stage_calls_total{stage="serialize"} 1' in lines
+    assert 'test_elements_total{tag="b"} 1' in lines
+    assert 'test_elements_total{tag="{u}c"} 1' in lines
+    assert lines[-1] == f'test_bytes_serialized_total {profiler.stats()["bytes_serialized"]}'
+    assert all(line.startswith('# ') or line.startswith('test_') for line in lines)
@@ -0,0 +1,46 @@
+from io import BytesIO
+
+import pytest
+
+from samples import SHAPES, dumps
+import xml2js
+
+
+@pytest.mark.parametrize('select', [['record/name'], ['record/body', 'record/tag']])
+def test_select(select):
+    xml = SHAPES['mixed'](16384)
+    expected = dumps(xml2js.xml2json(xml, select=select, compact=True))
+    assert dumps(xml2js.xml2json_select(BytesIO(xml), select, compact=True)) == expected
+
+
+def test_select_pruned():
+    xml = '<r x="1"><a>t<b>1</b></a><c><b>2</b></c></r>'
+    assert xml2js.xml2json(xml, select=['r/a/b'], compact=True, header=False) == \
+        {'r': {'_attributes': {'x': '1'}, 'a': {'b': {'_text': '1'}}}}
+    assert xml2js.xml2json(xml, select=['//b'], compact=True, header=False) == \
+        {'r': {'_attributes': {'x': '1'}, 'a': {'b': {'_text': '1'}}, 'c': {'b': {'_text': '2'}}}}
+
+
+def test_select_errors(monkeypatch):
+    textnodes = xml2js.textnodes
+
+    def failing(element, *args):
+        if element.tag == 'bad':
+            raise RuntimeError('bad element')
+        return textnodes(element, *args)
+
+    monkeypatch.setattr(xml2js, 'textnodes', failing)
+    xml = '<r><a><bad/></a><b/></r>'
+    assert isinstance(xml2js.xml2json(xml, select=['r/a']), Exception)
+    assert isinstance(xml2js.xml2json_select(BytesIO(xml.encode()), ['r/a']), Exception)
+    with pytest.raises(xml2js.ConversionError, match='bad element'):
+        xml2js.xml2json(xml, select=['r/a'], errors='strict')
+    errors = []
+    assert xml2js.xml2json(xml, select=['r/a', 'r/b'], compact=True, header=False, errors=errors) == \
+        {'r': {'a': {}, 'b': {}}}
+    assert [error.line for error in errors] == [1]
+
+
+def test_select_recursive_engine():
+    with pytest.raises(ValueError, match='recursive'):
+        xml2js.xml2json('<r><a/></r>', select=['r/a'], engine='recursive')
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from samples import OPTIONS, SAMPLES
+import xml2js
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('options', OPTIONS + [dict(text_engine='tostring')])
+@pytest.mark.parametrize('ensure_ascii', [True, False])
+def test_string(xml, options, ensure_ascii):
+    expected = json.dumps(xml2js.xml2json(xml, **options), ensure_ascii=ensure_ascii)
+    assert xml2js.xml2json_string(xml, ensure_ascii=ensure_ascii, **options) == expected
+    assert xml2js.xml2json_bytes(xml, ensure_ascii=ensure_ascii, **options) == expected.encode('utf-8')
+
+
+def test_dumpelement_subtree():
+    root = xml2js.parsexml(b'<r><a x="1">t<b/></a></r>')
+    assert xml2js.dumpelement(root[0], header=False, compact=True) == json.dumps(
+        xml2js.walkelement(root[0], header=False, compact=True))
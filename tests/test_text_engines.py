@@ -0,0 +1,15 @@
+import pytest
+
+from samples import OPTIONS, SAMPLES, dumps
+import xml2js
+
+
+@pytest.mark.parametrize('xml', SAMPLES)
+@pytest.mark.parametrize('options', OPTIONS)
+def test_text_engines(xml, options):
+    assert dumps(xml2js.xml2json(xml, text_engine='tostring', **options)) == dumps(xml2js.xml2json(xml, **options))
+
+
+def test_unknown_text_engine():
+    with pytest.raises(ValueError):
+        xml2js.xml2json('<a/>', text_engine='other', errors='strict')
@@ -1,173 +1,3054 @@
 #!/usr/bin/env python
+import argparse
+import asyncio
+import bz2
+import gzip
+import importlib
+import lzma
+import mmap
+import os
 import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from io import BytesIO
+from types import MappingProxyType
+from bisect import bisect_right
+from decimal import Decimal
+from itertools import accumulate, chain, count, islice
+from operator import add
+from json import JSONEncoder
+from json.encoder import encode_basestring, encode_basestring_ascii
 from lxml import etree
 from lxml.etree import tostring
 from lxml.etree import XMLParser
-from collections import OrderedDict
+from collections.abc import Mapping
+
+
+TEXT_ENGINES = ('single_pass', 'tostring')
+CONVERT_ENGINES = ('iterative', 'recursive')
+# 'return' gives back the exception instead of the output, 'strict' raises a ConversionError for the failing element.
+ERROR_MODES = ('return', 'strict')
+LEAF_TYPES = (etree._Comment, etree._ProcessingInstruction, etree._Entity)
+PATH_STEP = re.compile(r'\{[^}]*\}[^/]*|[^/]+')
+TAG_PATH = re.compile(r'(?:\{[^}]*\}[\w.-]+|[\w.-]+|\*)(?:/(?:\{[^}]*\}[\w.-]+|[\w.-]+|\*))*$')
+WORKER_STATE = {}
+DEFAULT_DICT = dict
+DECLARATION = dict(version='1.0', encoding='ISO-8859-1')
+PARSER_CACHE = threading.local()
+XML_PROLOG = re.compile(rb'(?:\xef\xbb\xbf)?(?:\s+|<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^\[>]*(?:\[.*?\]\s*)?>)*', re.S)
+START_TAG = re.compile(rb'<([^\s/>!?]+)[^>"\']*(?:(?:"[^"]*"|\'[^\']*\')[^>"\']*)*>')
+# Values are joined with NUL, which XML text cannot contain, and matched whole between separators.
+# re.ASCII keeps \d to 0-9: JavaScript's Number() rejects other Unicode digits.
+NATIVE_VALUE = re.compile(r'(?<![^\x00])(?:(?P<int>[+-]?\d+)|(?P<float>[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)'
+                          r'|(?P<bool>[Tt][Rr][Uu][Ee]|[Ff][Aa][Ll][Ss][Ee]))(?![^\x00])', re.ASCII)
+NUMERIC_TYPES = (int, float)
+ARROW_FORMATS = ('parquet', 'feather')
+BINARY_FORMATS = ('msgpack', 'cbor')
+BINARY_CONSTANTS = {'msgpack': {None: b'\xc0', False: b'\xc2', True: b'\xc3'},
+                    'cbor': {None: b'\xf6', False: b'\xf4', True: b'\xf5'}}
+# The fixed-size prefix and its limit, then the codes followed by 1, 2, 4 and 8 length bytes.
+MSGPACK_HEADS = {'int': (0x00, 0x80, (0xcc, 0xcd, 0xce, 0xcf)), 'str': (0xa0, 32, (0xd9, 0xda, 0xdb, None)),
+                 'array': (0x90, 16, (None, 0xdc, 0xdd, None)), 'map': (0x80, 16, (None, 0xde, 0xdf, None))}
+CBOR_MAJOR = dict(int=0, str=3, array=4, map=5)
+NAME_TABLE_SIZE = 65536
+COMPRESSED_MAGIC = ((b'\x1f\x8b', gzip.open), (b'BZh', bz2.open), (b'\xfd7zXZ\x00', lzma.open))
+# The active Profiler, which the conversion stages report to; while it is None each stage costs one test.
+PROFILER = None
 
 
 class LevelError(Exception):
     pass
 
 
-def xml_text(element, strip_cdata=False, compact=False, remove_blank_text=True):
+class ConversionError(Exception):
+    """
+    This class is the error of an element that failed to convert, raised in 'strict' mode and collected otherwise.
+    """
+
+    def __init__(self, message, path=None, line=None, index=None):
+        """
+        :param message: str, the type and message of the original error,
+        :param path: str, the XPath of the element in its document, e.g. '/catalog/item[3]/price',
+        :param line: int, the source line of the element,
+        :param index: int, the position of the document in the input of xml2json_many.
+        """
+        super().__init__(message, path, line, index)
+        self.message = message
+        self.path = path
+        self.line = line
+        self.index = index
+
+    def __str__(self):
+        location = [f'document {self.index}'] if self.index is not None else []
+        if self.path is not None:
+            location.append(f'element {self.path}')
+        location.append(f'line {self.line}')
+        return f'{self.message} ({", ".join(location)})'
+
+
+def conversionerror(error, element):
+    """
+    This function wraps an error raised while converting an element in a ConversionError.
+    :param error: Exception object,
+    :param element: etree._Element object, the element being converted,
+    :return: ConversionError object.
+    """
+    return ConversionError(f'{type(error).__name__}: {error}', element.getroottree().getpath(element),
+                           element.sourceline)
+
+
+class NameTable(dict):
+    """
+    This class interns tag and attribute names, including their namespace URIs: looking a name up returns the first
+    equal string seen, so the name is stored once in the output however often it repeats. lxml makes a new string
+    on every read of a tag or attribute name.
+    With max_size, names first seen once the table is full are returned as they are, so a table shared between
+    conversions stays bounded.
+    """
+
+    def __init__(self, max_size=None):
+        """
+        :param max_size: int, the maximum number of names kept, unbounded if not given.
+        """
+        super().__init__()
+        self.max_size = max_size
+
+    def __missing__(self, name):
+        if self.max_size is None or len(self) < self.max_size:
+            self[name] = name
+        return name
+
+    def attributes(self, attributes, dict_type=DEFAULT_DICT):
+        """
+        This function copies an attribute mapping with its names interned.
+        :param attributes: etree._Attrib object or mapping,
+        :param dict_type: type, the mapping type of the copy,
+        :return: dict_type().
+        """
+        return dict_type(zip(map(self.__getitem__, attributes.keys()), attributes.values()))
+
+
+def nametable(names=None):
+    """
+    This function resolves the names option of the converters.
+    :param names: NameTable object to share, None for a new table per conversion, or False not to intern,
+    :return: NameTable object, or None not to intern.
+    """
+    if names is None:
+        return NameTable()
+    # An empty table is falsy, so False is checked for explicitly.
+    return None if names is False else names
+
+
+class CDataIndex(object):
+    """
+    This class records the text() nodes of every element in a tree and which of them are CDATA sections.
+    The tree is serialized only once and the text/CDATA kinds are read off in document order.
+    Without CDATA the text nodes are exactly element.text and the children's tails, so nothing is stored.
+    """
+    _token_re = re.compile(r'<!\[CDATA\[.*?\]\]>|<!--.*?-->|<\?.*?\?>|<[^>]*>|[^<]+', re.S)
+
+    def __init__(self, element, has_cdata=None):
+        """
+        :param element: etree._Element object, the top element of the (sub)tree to index,
+        :param has_cdata: bool, False when the tree is known to hold no CDATA, which skips the serialization.
+        """
+        self._texts = {}
+        self.valid = True
+        self.has_cdata = has_cdata
+        timing = PROFILER.begin('cdata') if PROFILER is not None else None
+        if has_cdata is not False:
+            self.index(element)
+        if timing is not None:
+            PROFILER.end(timing)
+
+    def index(self, element):
+        """
+        This function serializes the tree once and records its text() nodes when it holds CDATA.
+        :param element: etree._Element object, the top element of the (sub)tree to index.
+        """
+        element_str = tostring(element, encoding='unicode', with_tail=False)
+        self.has_cdata = '<![CDATA[' in element_str
+        if not self.has_cdata:
+            return
+        kinds = [token[0] == '<' for token in self._token_re.findall(element_str)
+                 if token[0] != '<' or token.startswith('<![CDATA[')]
+        texts = element.xpath('.//text()')
+        if len(kinds) != len(texts):
+            # Unresolved entity references split text nodes differently from the serialization.
+            self.valid = False
+            return
+        for text, cdata in zip(texts, kinds):
+            owner = text.getparent().getparent() if text.is_tail else text.getparent()
+            self._texts.setdefault(owner, []).append((text, cdata))
+
+    def texts(self, element):
+        """
+        This function returns the element's text() nodes, each with whether it is a CDATA section.
+        :param element: etree._Element object inside the indexed tree,
+        :return: list of (str, bool) tuples, or None if the index could not be built.
+        """
+        if not self.valid:
+            return None
+        if isinstance(element, LEAF_TYPES):
+            return []
+        if not self.has_cdata:
+            texts = [(element.text, False)] if element.text is not None else []
+            texts.extend((child.tail, False) for child in element.iterchildren() if child.tail is not None)
+            return texts
+        return self._texts.get(element, [])
+
+
+def textnodes(element, strip_cdata=False, remove_blank_text=True, cdata_index=None):
+    """
+    This function pairs every stripped root text in the element with whether it is CDATA.
+    :param element: etree._Element object,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param cdata_index: CDataIndex object, if given texts come from the index instead of xpath and serialization,
+    :return: iterator of (str, bool) tuples.
+    """
+    if PROFILER is not None:
+        PROFILER.element(element)
+    texts = cdata_index.texts(element) if cdata_index is not None else None
+    if texts is not None:
+        text_iter = ((text.strip(), cdata and not strip_cdata) for text, cdata in texts)
+    else:
+        texts = (text.strip() for text in element.xpath('text()'))
+        if strip_cdata:
+            text_iter = ((text, False) for text in texts)
+        else:
+            element_str = tostring(element).decode()
+            text_iter = ((text, f'![CDATA[{text}]]' in element_str) for text in texts)
+    if remove_blank_text:
+        text_iter = ((text, cdata) for text, cdata in text_iter if text)
+    return text_iter
+
+
+def textoutput(texts, compact=False, dict_type=DEFAULT_DICT, always_array=False):
+    """
+    This function builds the xml-js text fields from (text, cdata) pairs, see textnodes.
+    :param texts: iterable of (str, bool) tuples,
+    :param compact: bool, whether output JSON in compact format,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :param always_array: bool or frozenset of str, compact keys kept as lists even with one item, see arraykeys,
+    :return: dict_type() in compact format, list otherwise, or None without texts.
+    """
+    timing = PROFILER.begin('text') if PROFILER is not None else None
+    output = dict_type(_cdata=[], _text=[]) if compact else []
+    iter_count = 0
+    for text, cdata in texts:
+        if compact:
+            if cdata:
+                output['_cdata'].append(text)
+            else:
+                output['_text'].append(text)
+        else:
+            if cdata:
+                output.append(dict_type(type='cdata', cdata=text))
+            else:
+                output.append(dict_type(type='text', text=text))
+        iter_count += 1
+    if compact:
+        if not output['_cdata']:
+            output.pop('_cdata')
+        elif len(output['_cdata']) == 1 and not (always_array is True or always_array and '_cdata' in always_array):
+            output.update(_cdata=output['_cdata'][0])
+        if not output['_text']:
+            output.pop('_text')
+        elif len(output['_text']) == 1 and not (always_array is True or always_array and '_text' in always_array):
+            output.update(_text=output['_text'][0])
+    output = output if iter_count else None
+    if timing is not None:
+        PROFILER.end(timing)
+    return output
+
+
+def xml_text(element, strip_cdata=False, compact=False, remove_blank_text=True, cdata_index=None,
+             dict_type=DEFAULT_DICT):
     """
     This function extracts all root texts in the element (no children's text).
     :param element: etree._Element object,
     :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
     :param compact: bool, whether output JSON in compact format,
     :param remove_blank_text: bool, whether to remove empty text from all text fields,
-    :return: OrderedDict().
+    :param cdata_index: CDataIndex object, if given CDATA is detected from the index instead of serializing the element,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :return: dict_type().
     """
     try:
-        output = OrderedDict(_cdata=[], _text=[]) if compact else []
-        element_str = tostring(element).decode()
-        text_iter = (text.strip() for text in element.xpath('text()'))
-        if remove_blank_text:
-            text_iter = (text for text in text_iter if text)
-        iter_count = 0
-        for text in text_iter:
-            cdata = f'![CDATA[{text}]]' in element_str if not strip_cdata else False
-            if compact:
-                if cdata:
-                    output['_cdata'].append(text)
-                else:
-                    output['_text'].append(text)
-            else:
-                if cdata:
-                    output.append(OrderedDict(type='cdata', cdata=text))
-                else:
-                    output.append(OrderedDict(type='text', text=text))
-            iter_count += 1
-        if compact:
-            if not output['_cdata']:
-                output.pop('_cdata')
-            elif len(output['_cdata']) == 1:
-                output.update(_cdata=output['_cdata'][0])
-            if not output['_text']:
-                output.pop('_text')
-            elif len(output['_text']) == 1:
-                output.update(_text=output['_text'][0])
-        output = output if iter_count else None
-        return output
+        return textoutput(textnodes(element, strip_cdata, remove_blank_text, cdata_index), compact, dict_type)
     except Exception as e:
         return Exception(e)
 
 
-def leafelement(element, strip_cdata=False, compact=False, remove_blank_text=True):
+def leafnode(element, strip_cdata=False, compact=False, remove_blank_text=True, cdata_index=None,
+             dict_type=DEFAULT_DICT, always_array=False, always_children=False, names=None):
+    """
+    This function converts lowest level tree/etree element to dict structure, raising on failure.
+    :param element: etree leaf-level object,
+    :param strip_data: bool, whether to parse CDATA as pure text or CDATA text,
+    :param compact: bool, whether output JSON in compact format,
+    :param cdata_index: CDataIndex object, see textnodes,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :param always_array: bool or frozenset of str, see arraykeys; the key of the leaf itself is left to the caller,
+    :param always_children: bool, whether an element gets an empty elements list in non-compact format,
+    :param names: NameTable object, interns the tag and attribute names of an element, not interned if not given,
+    :return: dict_type().
+    """
+    timing = PROFILER.begin('leaf') if PROFILER is not None else None
+    output = dict_type()
+    if element.getchildren():
+        raise LevelError('The element is not at the lowest level.')
+    if isinstance(element, etree._ProcessingInstruction):
+        proc_inst = tostring(element).decode()
+        name = re.search('<\?[^\s]+', proc_inst)
+        name = re.sub('<\?', '', name.group()) if name else ""
+        instruction = re.search(' [^=\s]+\?>$', proc_inst)
+        instruction = instruction.group()[:-2].strip() if instruction else ""
+        if compact:
+            output.update(_instruction=dict_type(name=instruction))
+        else:
+            output.update(type='instruction', name=name, instruction=instruction)
+        attributes = dict_type(element.attrib)
+        if attributes:
+            output.update(attributes=attributes)
+    elif isinstance(element, etree._Comment):
+        comment = element.text
+        if compact:
+            output.update(_comment=comment)
+        else:
+            output.update(type='comment', comment=comment)
+    elif isinstance(element, etree._Element):
+        tag = element.tag if names is None else names[element.tag]
+        attributes = element.attrib
+        if attributes:
+            attributes = dict_type(attributes) if names is None else names.attributes(attributes, dict_type)
+        text_output = textoutput(textnodes(element, strip_cdata, remove_blank_text, cdata_index), compact, dict_type,
+                                 always_array)
+        if compact:
+            output[tag] = dict_type()
+            if attributes:
+                output[tag].update(_attributes=attributes)
+            if text_output:
+                output[tag].update(text_output)
+        else:
+            output.update(type='element', name=tag)
+            if attributes:
+                output.update(attributes=attributes)
+            if text_output or always_children:
+                output.update(elements=text_output or [])
+    else:
+        raise TypeError('The input element has invalid type.')
+    if timing is not None:
+        PROFILER.end(timing)
+    return output
+
+
+def leafelement(element, strip_cdata=False, compact=False, remove_blank_text=True, cdata_index=None,
+                dict_type=DEFAULT_DICT):
     """
     This function converts lowest level tree/etree element to dict structure.
+    It returns the exception instead of raising it, see leafnode.
     :param element: etree leaf-level object,
     :param strip_data: bool, whether to parse CDATA as pure text or CDATA text,
     :param compact: bool, whether output JSON in compact format,
-    :return: OrderedDict().
+    :param cdata_index: CDataIndex object, passed through to xml_text,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :return: dict_type().
     """
     try:
-        output = OrderedDict()
-        if element.getchildren():
-            raise LevelError('The element is not at the lowest level.')
-        if isinstance(element, etree._ProcessingInstruction):
-            proc_inst = tostring(element).decode()
-            name = re.search('<\?[^\s]+', proc_inst)
-            name = re.sub('<\?', '', name.group()) if name else ""
-            instruction = re.search(' [^=\s]+\?>$', proc_inst)
-            instruction = instruction.group()[:-2].strip() if instruction else ""
-            if compact:
-                output.update(_instruction=OrderedDict(name=instruction))
-            else:
-                output.update(type='instruction', name=name, instruction=instruction)
-            attributes = OrderedDict(element.attrib)
+        return leafnode(element, strip_cdata, compact, remove_blank_text, cdata_index, dict_type)
+    except Exception as e:
+        return Exception(e)
+
+
+def declaration(compact, dict_type=DEFAULT_DICT):
+    """
+    This function builds the xml declaration entry of the output, which header puts ahead of the top element.
+    :param compact: bool, whether output JSON in compact format,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :return: (str, dict_type()) tuple of the key and the declaration node.
+    """
+    if compact:
+        return '_declaration', dict_type(_attributes=dict_type(DECLARATION))
+    return 'declaration', dict_type(attributes=dict_type(DECLARATION))
+
+
+def outputroot(header=True, compact=False, dict_type=DEFAULT_DICT):
+    """
+    This function starts the output of a document: the declaration if header is set and, in non-compact format,
+    the elements list of the top level.
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :return: (dict_type(), dict_type() or list) tuple of the output and the container the top element goes into.
+    """
+    output = dict_type()
+    if header:
+        key, node = declaration(compact, dict_type)
+        output[key] = node
+    if compact:
+        return output, output
+    output.update(elements=[])
+    return output, output['elements']
+
+
+def topblanktext(element, remove_blank_text=True):
+    """
+    This function tells whether blank text is removed from the top element converted: like parseelement, which
+    hands an element without children to leafnode, remove_blank_text only applies when it has children.
+    :param element: etree._Element object,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :return: bool.
+    """
+    return remove_blank_text if len(element) else True
+
+
+def parsetree(element, strip_cdata=False, header=True, compact=False, remove_blank_text=True,
+              text_engine='single_pass', cdata_index=None, dict_type=DEFAULT_DICT, max_depth=None,
+              max_children=None, depth=0, always_array=False, always_children=False, names=None):
+    """
+    This function is the recursion of parseelement, raising on failure; see parseelement for the parameters.
+    The compact node of the element is returned unwrapped under its key, since the caller inserts it into its
+    parent; only the top element is wrapped in a list by always_array here.
+    :return: dict_type().
+    """
+    tag = element.tag if names is None else names[element.tag]
+    attributes = element.attrib
+    if attributes:
+        attributes = dict_type(attributes) if names is None else names.attributes(attributes, dict_type)
+    output = outputroot(header, compact, dict_type)[0]
+    if compact:
+        if not element.getchildren():
+            output.update(leafnode(element, strip_cdata, compact, cdata_index=cdata_index, dict_type=dict_type,
+                                   always_array=always_array, names=names))
+        else:
+            text_output = textoutput(textnodes(element, strip_cdata, remove_blank_text, cdata_index), compact,
+                                     dict_type, always_array)
+            node = output[tag] = dict_type()
             if attributes:
-                output.update(attributes=attributes)
-        elif isinstance(element, etree._Comment):
-            comment = element.text
-            if compact:
-                output.update(_comment=comment)
-            else:
-                output.update(type='comment', comment=comment)
-        elif isinstance(element, etree._Element):
-            tag = element.tag
-            attributes = element.attrib
-            text_output = xml_text(element, strip_cdata, compact, remove_blank_text)
-            if compact:
-                output[tag] = OrderedDict()
-                if attributes:
-                    output[tag].update(_attributes=OrderedDict(attributes))
-                if text_output:
-                    output[tag].update(text_output)
+                node.update(_attributes=attributes)
+            if text_output:
+                node.update(text_output)
+            for index, child in enumerate(element.iterchildren()):
+                if lazyelement(child, index, max_depth and max_depth - depth, max_children):
+                    key = child.tag if names is None else names[child.tag]
+                    compactinsert(node, key, LazyNode(child, strip_cdata, compact, text_engine, dict_type, max_depth,
+                                                      max_children, always_array=always_array,
+                                                      names=False if names is None else names), always_array)
+                    continue
+                update_info = parsetree(child, strip_cdata, False, compact, text_engine=text_engine,
+                                        cdata_index=cdata_index, dict_type=dict_type, max_depth=max_depth,
+                                        max_children=max_children, depth=depth + 1, always_array=always_array,
+                                        names=names)
+                for key, value in update_info.items():
+                    compactinsert(node, key, value, always_array)
+        if not depth and (always_array is True or always_array and tag in always_array):
+            output[tag] = [output[tag]]
+    else:
+        if not element.getchildren():
+            output['elements'].append(leafnode(element, strip_cdata, compact, cdata_index=cdata_index,
+                                               dict_type=dict_type, always_children=always_children, names=names))
+            return output
+        text_output = textoutput(textnodes(element, strip_cdata, remove_blank_text, cdata_index), compact, dict_type)
+        output['elements'].append(dict_type(type='element', name=tag))
+        if attributes:
+            output['elements'][0].update(attributes=attributes)
+        output['elements'][0].update(elements=[])
+        if text_output:
+            output['elements'][0]['elements'].extend(text_output)
+        for index, child in enumerate(element.iterchildren()):
+            if lazyelement(child, index, max_depth and max_depth - depth, max_children):
+                output['elements'][0]['elements'].append(LazyNode(child, strip_cdata, compact, text_engine,
+                                                                  dict_type, max_depth, max_children,
+                                                                  always_children=always_children,
+                                                                  names=False if names is None else names))
+                continue
+            output['elements'][0]['elements'].extend(
+                parsetree(child, strip_cdata, False, compact, text_engine=text_engine,
+                          cdata_index=cdata_index, dict_type=dict_type, max_depth=max_depth,
+                          max_children=max_children, depth=depth + 1, always_children=always_children,
+                          names=names)['elements'])
+    return output
+
+
+def parseelement(element, strip_cdata=False, header=True, compact=False, remove_blank_text=True,
+                 text_engine='single_pass', cdata_index=None, dict_type=DEFAULT_DICT, max_depth=None,
+                 max_children=None, depth=0, errors='return', always_array=False, always_children=False,
+                 names=None):
+    """
+    This function wraps the leaf parsing and recursively parses the whole xml.
+    :param element: etree.ElementTree object,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per tree, 'tostring' serializes every element,
+    :param cdata_index: CDataIndex object, reused by the recursive calls of the 'single_pass' engine,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :param max_depth: int, the number of element levels converted eagerly, deeper elements become LazyNode,
+    :param max_children: int, the number of children converted eagerly per element, later ones become LazyNode,
+    :param depth: int, the level of the element below the top element, counted by the recursive calls,
+    :param errors: str or list, how a failing element is handled, see ERROR_MODES; a list collects the errors,
+                   which runs on walkelement since the recursion cannot resume after an element fails,
+    :param always_array: bool or iterable of str, see walkelement,
+    :param always_children: bool, see walkelement,
+    :param names: NameTable object or False, see walkelement,
+    :return: dict_type(), or the exception when errors is 'return'.
+    """
+    always_array = arraykeys(always_array)
+    if isinstance(errors, list):
+        return walkelement(element, strip_cdata, header, compact, remove_blank_text, text_engine, dict_type,
+                           max_depth, max_children, errors, always_array=always_array,
+                           always_children=always_children, names=names)
+    if errors not in ERROR_MODES:
+        raise ValueError(f'The errors mode must be one of {ERROR_MODES} or a list.')
+    timing = PROFILER.begin('build') if PROFILER is not None else None
+    try:
+        if text_engine not in TEXT_ENGINES:
+            raise ValueError(f'The text engine must be one of {TEXT_ENGINES}.')
+        if text_engine == 'single_pass' and cdata_index is None:
+            cdata_index = CDataIndex(element)
+        return parsetree(element, strip_cdata, header, compact, remove_blank_text, text_engine, cdata_index,
+                         dict_type, max_depth, max_children, depth, always_array, always_children,
+                         nametable(names))
+    except Exception as e:
+        if errors == 'strict':
+            # The failing element is read off the innermost parsetree frame, so the recursion needs no try.
+            failed, traceback = element, e.__traceback__
+            while traceback is not None:
+                if traceback.tb_frame.f_code is parsetree.__code__:
+                    failed = traceback.tb_frame.f_locals['element']
+                traceback = traceback.tb_next
+            raise conversionerror(e, failed) from e
+        return Exception(e)
+    finally:
+        if timing is not None:
+            PROFILER.end(timing)
+
+
+def arraykeys(always_array):
+    """
+    This function normalizes the always_array option (xml-js alwaysArray).
+    :param always_array: bool, whether every compact key holds a list, or iterable of str, the tags and keys
+                         such as '_text' that do,
+    :return: bool, or frozenset of str.
+    """
+    if isinstance(always_array, bool) or not always_array:
+        return bool(always_array)
+    if isinstance(always_array, str):
+        return frozenset([always_array])
+    return frozenset(always_array)
+
+
+def compactinsert(output, key, value, always_array=False):
+    """
+    This function adds a child to a compact JSON node, turning repeated keys into lists.
+    :param output: dict_type(), the compact JSON node of the parent,
+    :param key: str, the key of the child,
+    :param value: the compact JSON value of the child,
+    :param always_array: bool or frozenset of str, keys that start as a list, see arraykeys.
+    """
+    if key in output:
+        if not isinstance(output[key], list):
+            if PROFILER is not None:
+                PROFILER.promoted(key)
+            output[key] = [output[key]]
+        output[key].append(value)
+    elif always_array is True or always_array and key in always_array:
+        output[key] = [value]
+    else:
+        output[key] = value
+
+
+def lazyelement(element, index, max_depth=None, max_children=None):
+    """
+    This function decides whether a child element is left to a LazyNode instead of being converted.
+    :param element: etree._Element object, the child,
+    :param index: int, the position of the child among its siblings,
+    :param max_depth: int, the number of element levels converted eagerly, counting the child's parent,
+    :param max_children: int, the number of children converted eagerly per element,
+    :return: bool.
+    """
+    if isinstance(element, LEAF_TYPES):
+        return False
+    return (max_depth is not None and max_depth <= 1) or (max_children is not None and index >= max_children)
+
+
+class LazyNode(Mapping):
+    """
+    This class stands in for the JSON node of an element left unconverted by max_depth or max_children.
+    It converts the element's subtree on first access, with the same options and limits, and caches the result.
+    The node keeps the element, and so the whole parsed document, alive until it is converted.
+    Use json.dumps(output, default=dict) to serialize output containing lazy nodes.
+    """
+
+    def __init__(self, element, strip_cdata=False, compact=False, text_engine='single_pass',
+                 dict_type=DEFAULT_DICT, max_depth=None, max_children=None, **options):
+        self.element = element
+        self.options = dict(strip_cdata=strip_cdata, compact=compact, text_engine=text_engine, dict_type=dict_type,
+                            max_depth=max_depth, max_children=max_children, **options)
+        self._node = None
+
+    @property
+    def node(self):
+        """
+        This function converts the element on first use.
+        :return: dict_type(), the compact node or the non-compact element node.
+        """
+        if self._node is None:
+            output = walkelement(self.element, header=False, **self.options)
+            if isinstance(output, Exception):
+                raise output
+            if self.options['compact']:
+                node = output[self.element.tag]
+                # Under always_array the element comes back in a list of its own; the parent holds the list.
+                self._node = node[0] if isinstance(node, list) else node
             else:
-                output.update(type='element', name=tag)
-                if attributes:
-                    output.update(attributes=OrderedDict(attributes))
+                self._node = output['elements'][0]
+            self.element = None
+        return self._node
+
+    def __getitem__(self, key):
+        return self.node[key]
+
+    def __iter__(self):
+        return iter(self.node)
+
+    def __len__(self):
+        return len(self.node)
+
+    def __repr__(self):
+        if self._node is None:
+            return f'LazyNode({self.element.tag!r})'
+        return f'LazyNode({self._node!r})'
+
+
+class CompactView(Mapping):
+    """
+    This class is a read-only compact xml-js view of an element, computed from the tree on demand.
+    The keys of a node (_attributes, _cdata, _text, comments and child tags grouped into lists) are worked out on
+    first access and cached. Child elements are views themselves, so untouched parts of the document are never
+    converted. The view keeps the parsed document alive; use json.dumps(view, default=dict) to serialize it.
+    """
+
+    def __init__(self, element, context, blank_text=True, cdata_index=None):
+        """
+        :param element: etree._Element object,
+        :param context: dict, the options shared by all views of a document, see lazyview,
+        :param blank_text: bool, whether to remove empty text from the element's text fields,
+        :param cdata_index: CDataIndex object covering the element, built by an ancestor view.
+        """
+        self.element = element
+        self.context = context
+        self.blank_text = blank_text
+        self.cdata_index = cdata_index
+        self._node = None
+
+    @property
+    def node(self):
+        """
+        This function converts the element itself, leaving its child elements as views, on first use.
+        :return: dict_type(), the compact node.
+        """
+        if self._node is None:
+            element = self.element
+            context = self.context
+            dict_type = context['dict_type']
+            children = element.getchildren()
+            node = dict_type()
+            if element.attrib:
+                node.update(_attributes=dict_type(element.attrib))
+            texts = [element.text] + [child.tail for child in children]
+            if any(text is not None and (text.strip() or not self.blank_text) for text in texts):
+                # The index covers the whole subtree, so it is built once here and handed down to the children.
+                if self.cdata_index is None and context['text_engine'] == 'single_pass':
+                    self.cdata_index = CDataIndex(element)
+                text_output = xml_text(element, context['strip_cdata'], True, self.blank_text, self.cdata_index,
+                                       dict_type)
+                if isinstance(text_output, Exception):
+                    raise text_output
                 if text_output:
-                    output.update(elements=text_output)
-        else:
-            raise TypeError('The input element has invalid type.')
+                    node.update(text_output)
+            for child in children:
+                if isinstance(child, LEAF_TYPES):
+                    for key, value in leafelement(child, context['strip_cdata'], True, dict_type=dict_type).items():
+                        compactinsert(node, key, value)
+                else:
+                    compactinsert(node, child.tag, CompactView(child, context, cdata_index=self.cdata_index))
+            self._node = node
+        return self._node
+
+    def __getitem__(self, key):
+        return self.node[key]
+
+    def __iter__(self):
+        return iter(self.node)
+
+    def __len__(self):
+        return len(self.node)
+
+    def __repr__(self):
+        return f'CompactView({self.element.tag!r})'
+
+
+def lazyview(element, strip_cdata=False, header=True, remove_blank_text=True, text_engine='single_pass',
+             dict_type=DEFAULT_DICT):
+    """
+    This function wraps the element in a lazily computed compact xml-js view, see CompactView.
+    :param element: etree._Element object,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param header: bool, whether to include header info in the JSON,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per accessed subtree with text, 'tostring'
+                        serializes every element with text,
+    :param dict_type: type, the mapping type of every converted JSON object,
+    :return: MappingProxyType object.
+    """
+    if text_engine not in TEXT_ENGINES:
+        raise ValueError(f'The text engine must be one of {TEXT_ENGINES}.')
+    context = dict(strip_cdata=strip_cdata, text_engine=text_engine, dict_type=dict_type)
+    output = outputroot(header, True, dict_type)[0]
+    output[element.tag] = CompactView(element, context, topblanktext(element, remove_blank_text))
+    return MappingProxyType(output)
+
+
+def nativevalue(match, numeric_types=NUMERIC_TYPES):
+    """
+    This function converts one NATIVE_VALUE match, see nativevalues.
+    :param match: re.Match object,
+    :param numeric_types: tuple of int, float and Decimal,
+    :return: int, float, Decimal, bool, or the str itself when no numeric type fits.
+    """
+    text = match.group()
+    if match.group('bool'):
+        return text.lower() == 'true'
+    for numeric_type in numeric_types:
+        if numeric_type is not int or match.group('int'):
+            try:
+                return numeric_type(text)
+            except ValueError:
+                # int refuses numerals longer than sys.get_int_max_str_digits(); the next type takes them.
+                continue
+    return text
+
+
+def nativevalues(values, numeric_types=NUMERIC_TYPES):
+    """
+    This function is xml-js nativeType: numerals become numbers and 'true'/'false' (any case) become booleans.
+    All values are checked together by a single regex scan over their NUL-joined text, so Python-level work is
+    only spent on the values that convert.
+    :param values: list of str,
+    :param numeric_types: tuple of int, float and Decimal; an integral numeral takes the first of them that
+                          converts it, any other numeral the first that is not int, and stays a string without one,
+    :return: list, the values with the converted ones replaced.
+    """
+    output = list(values)
+    if not output:
         return output
+    starts = list(map(add, chain([0], accumulate(map(len, output))), count()))
+    for match in NATIVE_VALUE.finditer('\x00'.join(output)):
+        output[bisect_right(starts, match.start()) - 1] = nativevalue(match, numeric_types)
+    return output
+
+
+def nativeupdate(texts, attributes, compact=False, numeric_types=NUMERIC_TYPES):
+    """
+    This function applies nativevalues to the text and attribute values collected during a conversion, in place.
+    :param texts: list of dicts, compact nodes holding _text, or non-compact text nodes,
+    :param attributes: list of dicts, attribute mappings,
+    :param compact: bool, whether the text nodes are compact,
+    :param numeric_types: tuple of int, float and Decimal, see nativevalues.
+    """
+    if texts:
+        if compact:
+            values = []
+            for node in texts:
+                if isinstance(node['_text'], list):
+                    values.extend(node['_text'])
+                else:
+                    values.append(node['_text'])
+            converted = iter(nativevalues(values, numeric_types))
+            for node in texts:
+                if isinstance(node['_text'], list):
+                    node['_text'] = list(islice(converted, len(node['_text'])))
+                else:
+                    node['_text'] = next(converted)
+        else:
+            for node, value in zip(texts, nativevalues([node['text'] for node in texts], numeric_types)):
+                node['text'] = value
+    if attributes:
+        converted = iter(nativevalues([value for mapping in attributes for value in mapping.values()],
+                                      numeric_types))
+        for mapping in attributes:
+            mapping.update(zip(list(mapping), converted))
+
+
+def walkslices(element, strip_cdata=False, header=True, compact=False, remove_blank_text=True,
+               text_engine='single_pass', dict_type=DEFAULT_DICT, max_depth=None, max_children=None,
+               slice_size=None, errors='return', native_type=False, native_type_attributes=False,
+               numeric_types=NUMERIC_TYPES, always_array=False, always_children=False, names=None):
+    """
+    This generator does the work of walkelement, pausing after every slice_size nodes.
+    It yields None at each pause and the finished output last, so a caller can interleave other work.
+    :param slice_size: int, the number of nodes converted between pauses, no pauses if not given,
+    :param errors: str or list, see walkelement,
+    :param native_type: bool, see walkelement,
+    :param native_type_attributes: bool, see walkelement,
+    :param numeric_types: tuple, see walkelement,
+    :param always_array: bool or iterable of str, see walkelement,
+    :param always_children: bool, see walkelement,
+    :param names: NameTable object or False, see walkelement,
+    :return: generator of None and finally dict_type().
+    """
+    if text_engine not in TEXT_ENGINES:
+        raise ValueError(f'The text engine must be one of {TEXT_ENGINES}.')
+    if not isinstance(errors, list) and errors not in ERROR_MODES:
+        raise ValueError(f'The errors mode must be one of {ERROR_MODES} or a list.')
+    cdata_index = CDataIndex(element) if text_engine == 'single_pass' else None
+    always_array = arraykeys(always_array)
+    names = nametable(names)
+    output, container = outputroot(header, compact, dict_type)
+    stack = [(element, container, topblanktext(element, remove_blank_text), max_depth, False)]
+    native_texts = [] if native_type else None
+    native_attributes = [] if native_type_attributes else None
+    # The options a LazyNode converts its subtree with, beyond its positional ones.
+    lazy_options = dict(native_type=native_type, native_type_attributes=native_type_attributes,
+                        numeric_types=numeric_types, always_array=always_array, always_children=always_children,
+                        names=False if names is None else names)
+    node_count = 0
+    # The try wraps the whole walk instead of each element; after a collected error the walk resumes
+    # with the next element on the stack, skipping the failed one and its subtree.
+    while stack:
+        try:
+            while stack:
+                if slice_size:
+                    node_count += 1
+                    if not node_count % slice_size:
+                        yield None
+                element, container, blank_text, depth, lazy = stack.pop()
+                if lazy:
+                    node = LazyNode(element, strip_cdata, compact, text_engine, dict_type, max_depth, max_children,
+                                    **lazy_options)
+                    if compact:
+                        compactinsert(container, element.tag if names is None else names[element.tag], node,
+                                      always_array)
+                    else:
+                        container.append(node)
+                    continue
+                if isinstance(element, LEAF_TYPES):
+                    leaf_output = leafnode(element, strip_cdata, compact, cdata_index=cdata_index,
+                                           dict_type=dict_type)
+                    if compact:
+                        for key, value in leaf_output.items():
+                            compactinsert(container, key, value, always_array)
+                    else:
+                        container.append(leaf_output)
+                    continue
+                tag = element.tag if names is None else names[element.tag]
+                attributes = element.attrib
+                if attributes:
+                    attributes = dict_type(attributes) if names is None else names.attributes(attributes, dict_type)
+                children = element.getchildren()
+                text_output = textoutput(textnodes(element, strip_cdata, blank_text, cdata_index), compact,
+                                         dict_type, always_array)
+                if compact:
+                    node = dict_type()
+                    if attributes:
+                        node.update(_attributes=attributes)
+                        if native_attributes is not None:
+                            native_attributes.append(node['_attributes'])
+                    if text_output:
+                        node.update(text_output)
+                        if native_texts is not None and '_text' in node:
+                            native_texts.append(node)
+                    compactinsert(container, tag, node, always_array)
+                    container = node
+                else:
+                    node = dict_type(type='element', name=tag)
+                    if attributes:
+                        node.update(attributes=attributes)
+                        if native_attributes is not None:
+                            native_attributes.append(node['attributes'])
+                    if text_output or children or always_children:
+                        node.update(elements=text_output or [])
+                        if native_texts is not None and text_output:
+                            native_texts.extend(text for text in text_output if text['type'] == 'text')
+                    container.append(node)
+                    container = node.get('elements')
+                if depth is None and max_children is None:
+                    stack.extend((child, container, True, None, False) for child in reversed(children))
+                else:
+                    stack.extend((child, container, True, depth and depth - 1,
+                                  lazyelement(child, index, depth, max_children))
+                                 for index, child in reversed(list(enumerate(children))))
+        except Exception as e:
+            if errors == 'return':
+                raise
+            error = conversionerror(e, element)
+            if errors == 'strict':
+                raise error from e
+            errors.append(error)
+    if native_type or native_type_attributes:
+        nativeupdate(native_texts, native_attributes, compact, numeric_types)
+    yield output
+
+
+def walkelement(element, strip_cdata=False, header=True, compact=False, remove_blank_text=True,
+                text_engine='single_pass', dict_type=DEFAULT_DICT, max_depth=None, max_children=None,
+                errors='return', native_type=False, native_type_attributes=False, numeric_types=NUMERIC_TYPES,
+                always_array=False, always_children=False, names=None):
+    """
+    This function parses the whole xml like parseelement, but walks the tree with an explicit stack.
+    Each node is built once and attached to its parent in place, so deep documents do not hit the recursion limit.
+    :param element: etree.ElementTree object,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per tree, 'tostring' serializes every element,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :param max_depth: int, the number of element levels converted eagerly, deeper elements become LazyNode,
+    :param max_children: int, the number of children converted eagerly per element, later ones become LazyNode,
+    :param errors: str or list, how a failing element is handled: 'return' gives back the exception instead of the
+                   output, 'strict' raises a ConversionError with the element's path and line, and a list collects
+                   a ConversionError per failing element, which is left out of the output, and carries on,
+    :param native_type: bool, whether numeral and boolean texts become numbers and booleans (xml-js nativeType),
+                        converted in one batch after the walk, see nativevalues,
+    :param native_type_attributes: bool, the same for attribute values (xml-js nativeTypeAttributes),
+    :param numeric_types: tuple of int, float and Decimal, the numeric types produced, see nativevalues,
+    :param always_array: bool or iterable of str, compact keys that always hold a list, even of one item, so every
+                         field keeps one type across documents (xml-js alwaysArray), see arraykeys,
+    :param always_children: bool, whether every element gets an elements list in non-compact format, even when
+                            empty (xml-js alwaysChildren),
+    :param names: NameTable object shared with other conversions, a new table for this conversion if not given,
+                  or False to keep lxml's own string for every tag and attribute name,
+    :return: dict_type(), or the exception when errors is 'return'.
+    """
+    options = dict(native_type=native_type, native_type_attributes=native_type_attributes, numeric_types=numeric_types,
+                   always_array=always_array, always_children=always_children, names=names)
+    if errors != 'return':
+        options.update(errors=errors)
+    timing = PROFILER.begin('build') if PROFILER is not None else None
+    try:
+        return next(walkslices(element, strip_cdata, header, compact, remove_blank_text, text_engine, dict_type,
+                               max_depth, max_children, **options))
     except Exception as e:
+        if errors != 'return':
+            raise
         return Exception(e)
+    finally:
+        if timing is not None:
+            PROFILER.end(timing)
 
 
-def parseelement(element, strip_cdata=False, header=True, compact=False, remove_blank_text=True):
+def cachedparser(**options):
     """
-    This function wraps the leaf parsing and recursively parses the whole xml.
+    This function returns an XMLParser configured with the options, building it once per thread.
+    lxml parsers must not be shared between threads, so each thread keeps its own cache.
+    :param options: keyword options of etree.XMLParser, e.g. remove_comments, remove_pis, strip_cdata,
+    :return: etree.XMLParser object.
+    """
+    cache = PARSER_CACHE.__dict__
+    if 'parsers' not in cache:
+        cache.update(parsers={}, hits=0, misses=0)
+    key = tuple(sorted(options.items()))
+    parser = cache['parsers'].get(key)
+    if parser is None:
+        parser = cache['parsers'][key] = XMLParser(**options)
+        cache['misses'] += 1
+    else:
+        cache['hits'] += 1
+    return parser
+
+
+def parser_cache_info():
+    """
+    This function reports the parser cache of the current thread.
+    :return: dict with the cached option tuples under 'parsers' and the 'hits' and 'misses' counts.
+    """
+    cache = PARSER_CACHE.__dict__
+    return dict(parsers=list(cache.get('parsers', ())), hits=cache.get('hits', 0), misses=cache.get('misses', 0))
+
+
+def clear_parser_cache():
+    """
+    This function drops the cached parsers and counts of the current thread.
+    """
+    PARSER_CACHE.__dict__.clear()
+
+
+def mapfile(path):
+    """
+    This function maps a file into memory read-only; use it as a context manager.
+    :param path: str or os.PathLike object,
+    :return: mmap.mmap object, or an empty memoryview for an empty file, which cannot be mapped.
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return memoryview(b'')
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def parsexml(xml, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, huge_tree=False):
+    """
+    This function parses the xml document into its root element.
+    Paths are read by libxml2 itself in small blocks and buffers (bytearray, memoryview, mmap) are handed to it as
+    they are, so the document is never copied into a Python bytes or str object.
+    :param xml: str or bytes, the xml document, an os.PathLike path to it, or a buffer protocol object holding it,
+    :param parser: etree.XMLParser object, taken from this thread's parser cache if not given,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param huge_tree: bool, whether to lift libxml2's depth and size limits, e.g. for more than 256 levels,
+    :return: etree._Element object.
+    """
+    if not parser:
+        parser = cachedparser(remove_comments=remove_comments, remove_pis=remove_pis, strip_cdata=strip_cdata,
+                              huge_tree=huge_tree)
+    timing = PROFILER.begin('parse') if PROFILER is not None else None
+    if isinstance(xml, os.PathLike):
+        # Reading the file in blocks keeps the peak below mapping it, whose touched pages all count as resident.
+        root = etree.parse(os.fspath(xml), parser=parser).getroot()
+    else:
+        if not isinstance(xml, str) and not isinstance(xml, bytes):
+            try:
+                xml = memoryview(xml)
+            except TypeError:
+                raise TypeError('The input xml not string, byte, path or buffer format.') from None
+            if not xml.nbytes:
+                # lxml reads past the end of an empty buffer; an empty bytes gives the usual syntax error.
+                xml = b''
+        root = etree.fromstring(xml, parser=parser)
+    if timing is not None:
+        PROFILER.end(timing)
+    return root
+
+
+def xml2json(xml, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
+             compact=False, remove_blank_text=True, text_engine='single_pass', engine='iterative', dict_type=None,
+             select=None, max_depth=None, max_children=None, lazy=False, errors='return', native_type=False,
+             native_type_attributes=False, numeric_types=NUMERIC_TYPES, always_array=False, always_children=False,
+             names=None, huge_tree=False):
+    """
+    This function parses the xml string and converts it to xml-js format JSON.
+    :param xml: str or bytes, the xml document, an os.PathLike path to it, or a buffer holding it, see parsexml,
+    :param parser: etree.XMLParser object, taken from this thread's parser cache if not given,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per tree, 'tostring' serializes every element,
+    :param engine: str, 'iterative' uses walkelement, 'recursive' uses parseelement,
+    :param dict_type: type, the mapping type of every JSON object in the output, dict on Python 3.7+ by default,
+    :param select: list of str, tag paths or XPath expressions; only the matching subtrees are converted by the
+                   iterative engine, see SelectionConverter,
+    :param max_depth: int, the number of element levels converted eagerly, deeper elements become LazyNode,
+    :param max_children: int, the number of children converted eagerly per element, later ones become LazyNode,
+    :param lazy: bool, whether to return a read-only view that converts nodes on access, compact format only,
+                 see CompactView,
+    :param errors: str or list, 'return' gives back the exception of a failing element instead of the output,
+                   'strict' raises a ConversionError with its path and line, and a list collects a ConversionError
+                   per failing element, which is left out, and converts the rest, see walkelement,
+    :param native_type: bool, whether numeral and boolean texts become numbers and booleans (xml-js nativeType);
+                        this runs on the iterative engine,
+    :param native_type_attributes: bool, the same for attribute values (xml-js nativeTypeAttributes),
+    :param numeric_types: tuple of int, float and Decimal, the numeric types produced, see nativevalues,
+    :param always_array: bool or iterable of str, compact keys that always hold a list (xml-js alwaysArray),
+                         see walkelement,
+    :param always_children: bool, whether every element gets an elements list in non-compact format
+                            (xml-js alwaysChildren),
+    :param names: NameTable object interning tag and attribute names across conversions, a new table for this
+                  conversion if not given, or False not to intern, see walkelement,
+    :param huge_tree: bool, whether to lift libxml2's depth and size limits, see parsexml,
+    :return: dict_type(), or a read-only mapping when lazy is set.
+    """
+    if engine not in CONVERT_ENGINES:
+        raise ValueError(f'The engine must be one of {CONVERT_ENGINES}.')
+    root = parsexml(xml, parser, strip_cdata, remove_comments, remove_pis, huge_tree)
+    return convertelement(root, strip_cdata=strip_cdata,
+                          header=header, compact=compact, remove_blank_text=remove_blank_text,
+                          text_engine=text_engine, engine=engine, dict_type=dict_type, select=select,
+                          max_depth=max_depth, max_children=max_children, lazy=lazy, errors=errors,
+                          native_type=native_type, native_type_attributes=native_type_attributes,
+                          numeric_types=numeric_types, always_array=always_array, always_children=always_children,
+                          names=names)
+
+
+def convertelement(root, strip_cdata=False, header=True, compact=False, remove_blank_text=True,
+                   text_engine='single_pass', engine='iterative', dict_type=None, select=None, max_depth=None,
+                   max_children=None, lazy=False, errors='return', native_type=False, native_type_attributes=False,
+                   numeric_types=NUMERIC_TYPES, always_array=False, always_children=False, names=None):
+    """
+    This function converts a parsed root element the way xml2json converts the document it parses.
+    :param root: etree._Element object,
+    The other parameters are the conversion options of xml2json.
+    :return: dict_type(), or a read-only mapping when lazy is set.
+    """
+    if engine not in CONVERT_ENGINES:
+        raise ValueError(f'The engine must be one of {CONVERT_ENGINES}.')
+    native = dict(native_type=native_type, native_type_attributes=native_type_attributes,
+                  numeric_types=numeric_types) if native_type or native_type_attributes else {}
+    if lazy:
+        if not compact:
+            raise ValueError('The lazy view is only available in compact format.')
+        if native or always_array:
+            raise ValueError('The lazy view does not convert native types or always_array.')
+        return lazyview(root, strip_cdata=strip_cdata, header=header, remove_blank_text=remove_blank_text,
+                        text_engine=text_engine, dict_type=dict_type or DEFAULT_DICT)
+    if select:
+        if engine == 'recursive':
+            raise ValueError('The recursive engine does not convert selections, see SelectionConverter.')
+        selection = SelectionConverter(selectmatcher(select, root), strip_cdata=strip_cdata, header=header,
+                                       compact=compact, remove_blank_text=remove_blank_text,
+                                       text_engine=text_engine, dict_type=dict_type or DEFAULT_DICT,
+                                       max_depth=max_depth, max_children=max_children, errors=errors,
+                                       always_array=always_array, always_children=always_children, names=names,
+                                       **native)
+        return selection.convert(etree.iterwalk(root, events=('start', 'end')))
+    if native or engine == 'iterative':
+        return walkelement(root, strip_cdata=strip_cdata, header=header, compact=compact,
+                           remove_blank_text=remove_blank_text, text_engine=text_engine,
+                           dict_type=dict_type or DEFAULT_DICT, max_depth=max_depth, max_children=max_children,
+                           errors=errors, always_array=always_array, always_children=always_children, names=names,
+                           **native)
+    return parseelement(root, strip_cdata=strip_cdata, header=header, compact=compact,
+                        remove_blank_text=remove_blank_text, text_engine=text_engine,
+                        dict_type=dict_type or DEFAULT_DICT, max_depth=max_depth, max_children=max_children,
+                        errors=errors, always_array=always_array, always_children=always_children, names=names)
+
+
+def dumpelement(element, strip_cdata=False, header=True, compact=False, remove_blank_text=True,
+                text_engine='single_pass', ensure_ascii=True):
+    """
+    This function writes the xml-js format JSON text of the element straight from the tree.
+    No intermediate dict tree is built; the text equals json.dumps() of walkelement's output.
     :param element: etree.ElementTree object,
     :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
     :param header: bool, whether to include header info in the JSON,
     :param compact: bool, whether output JSON in compact format,
     :param remove_blank_text: bool, whether to remove empty text from all text fields,
-    :return: OrderedDict().
+    :param text_engine: str, 'single_pass' indexes CDATA once per tree, 'tostring' serializes every element,
+    :param ensure_ascii: bool, same as json.dumps ensure_ascii,
+    :return: str.
     """
-    try:
-        output = OrderedDict()
-        tag = element.tag
+    if text_engine not in TEXT_ENGINES:
+        raise ValueError(f'The text engine must be one of {TEXT_ENGINES}.')
+    timing = PROFILER.begin('serialize') if PROFILER is not None else None
+    cdata_index = CDataIndex(element) if text_engine == 'single_pass' else None
+    encode = JSONEncoder(ensure_ascii=ensure_ascii).encode
+    encode_str = encode_basestring_ascii if ensure_ascii else encode_basestring
+    names = {}
+
+    def name(key):
+        encoded = names.get(key)
+        if encoded is None:
+            encoded = names[key] = encode_str(key)
+        return encoded
+
+    def attributemap(attributes):
+        return '{' + ', '.join([name(key) + ': ' + encode_str(value) for key, value in attributes.items()]) + '}'
+
+    def leaf(element):
+        # Returns the JSON of an element without children as one string.
+        if isinstance(element, LEAF_TYPES):
+            leaf_output = leafelement(element, strip_cdata, compact, cdata_index=cdata_index)
+            return encode(next(iter(leaf_output.values())) if compact else leaf_output)
+        fields = []
         attributes = element.attrib
-        text_output = xml_text(element, strip_cdata, compact, remove_blank_text)
+        if attributes:
+            fields.append('"_attributes": ' + attributemap(attributes))
+        texts = []
+        cdatas = []
+        for value, cdata in textnodes(element, strip_cdata, True, cdata_index):
+            (cdatas if cdata else texts).append(encode_str(value))
+        if cdatas:
+            fields.append('"_cdata": ' + (cdatas[0] if len(cdatas) == 1 else '[' + ', '.join(cdatas) + ']'))
+        if texts:
+            fields.append('"_text": ' + (texts[0] if len(texts) == 1 else '[' + ', '.join(texts) + ']'))
+        return '{' + ', '.join(fields) + '}'
+
+    def render(element, blank_text):
+        # Returns the JSON of the element as strings, with children that have children of their own left in place.
+        if isinstance(element, LEAF_TYPES) or compact and not len(element):
+            return [leaf(element)]
+        texts = textnodes(element, strip_cdata, blank_text, cdata_index)
+        attributes = element.attrib
+        parts = []
         if compact:
-            if header:
-                output.update(_declaration=OrderedDict(_attributes=OrderedDict(version='1.0', encoding='ISO-8859-1')))
-            if not element.getchildren():
-                output.update(leafelement(element, strip_cdata, compact))
-                return output
-            output.update({tag: OrderedDict()})
+            groups = {}
             if attributes:
-                output[tag].update(_attributes=OrderedDict(attributes))
-            if text_output:
-                output[tag].update(text_output)
-            for child in element.iterchildren():
-                update_info = parseelement(child, strip_cdata, False, compact)
-                key = list(update_info.keys())[0]
-                if key in output[tag]:
-                    if not isinstance(output[tag][key], list):
-                        output[tag][key] = [output[tag][key]]
-                    output[tag][key].append(update_info[key])
+                groups['_attributes'] = [attributemap(attributes)]
+            text_values = []
+            cdatas = []
+            for value, cdata in texts:
+                (cdatas if cdata else text_values).append(encode_str(value))
+            # Same key order as textoutput: CDATA before text.
+            if cdatas:
+                groups['_cdata'] = cdatas
+            if text_values:
+                groups['_text'] = text_values
+            for child in element:
+                tag = child.tag
+                if isinstance(tag, str):
+                    key = tag
+                elif tag is etree.Comment:
+                    key = '_comment'
+                elif tag is etree.PI:
+                    key = '_instruction'
                 else:
-                    output[tag].update(update_info)
+                    key = next(iter(leafelement(child, strip_cdata, compact).keys()))
+                group = groups.get(key)
+                if group is None:
+                    groups[key] = [child]
+                else:
+                    group.append(child)
+            text = '{'
+            for group_index, (key, values) in enumerate(groups.items()):
+                text += (', ' if group_index else '') + name(key) + (': [' if len(values) > 1 else ': ')
+                for index, value in enumerate(values):
+                    if index:
+                        text += ', '
+                    if isinstance(value, str):
+                        text += value
+                    elif len(value):
+                        parts.append(text)
+                        parts.append(value)
+                        text = ''
+                    else:
+                        text += leaf(value)
+                if len(values) > 1:
+                    text += ']'
+            parts.append(text + '}')
         else:
-            if header:
-                output.update(declaration=OrderedDict(attributes=OrderedDict(version='1.0', encoding='ISO-8859-1')))
-            output.update(elements=[])
-            if not element.getchildren():
-                output['elements'].append(leafelement(element, strip_cdata, compact))
-                return output
-            output['elements'].append(OrderedDict(type='element', name=tag))
+            parts.append('{"type": "element", "name": ' + name(element.tag))
             if attributes:
-                output['elements'][0].update(attributes=OrderedDict(attributes))
-            output['elements'][0].update(elements=[])
-            if text_output:
-                output['elements'][0]['elements'].extend(xml_text(element, strip_cdata, compact, remove_blank_text))
-            for child in element.iterchildren():
-                output['elements'][0]['elements'].extend(parseelement(child, strip_cdata, False, compact)['elements'])
-        return output
-    except Exception as e:
-        return Exception(e)
+                parts.append(', "attributes": ' + attributemap(attributes))
+            values = [('{"type": "cdata", "cdata": ' if cdata else '{"type": "text", "text": ') + encode_str(text) + '}'
+                      for text, cdata in texts]
+            children = element.getchildren()
+            if values or children:
+                parts.append(', "elements": [' + ', '.join(values))
+                for index, child in enumerate(children):
+                    if index or values:
+                        parts.append(', ')
+                    if len(child):
+                        parts.append(child)
+                    else:
+                        parts.extend(render(child, True))
+                parts.append(']')
+            parts.append('}')
+        return parts
 
+    buffer = ['{']
+    if header:
+        key, node = declaration(compact)
+        buffer.append(name(key) + ': ' + encode(node) + ', ')
+    if compact:
+        buffer.append(name(element.tag) + ': ')
+        closing = '}'
+    else:
+        buffer.append('"elements": [')
+        closing = ']}'
+    # A stack of part iterators: strings are written out, and an element left in place is rendered in turn.
+    iterators = [iter(render(element, topblanktext(element, remove_blank_text)))]
+    while iterators:
+        for item in iterators[-1]:
+            if isinstance(item, str):
+                buffer.append(item)
+            else:
+                iterators.append(iter(render(item, True)))
+                break
+        else:
+            iterators.pop()
+    buffer.append(closing)
+    text = ''.join(buffer)
+    if timing is not None:
+        PROFILER.end(timing)
+        PROFILER.serialized(text)
+    return text
 
-def xml2json(xml, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
-             compact=False, remove_blank_text=True):
-    if not isinstance(xml, str) and not isinstance(xml, bytes):
-        raise TypeError('The input xml not string or byte format.')
-    if not parser:
-        parser = XMLParser(remove_comments=remove_comments, remove_pis=remove_pis, strip_cdata=strip_cdata)
-    return parseelement(etree.fromstring(xml, parser=parser), strip_cdata=strip_cdata, header=header, compact=compact,
-                        remove_blank_text=remove_blank_text)
+
+def xml2json_string(xml, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
+                    compact=False, remove_blank_text=True, text_engine='single_pass', ensure_ascii=True,
+                    huge_tree=False):
+    """
+    This function parses the xml string and writes xml-js format JSON text without building the dict output.
+    The options are the same as xml2json, and the result equals json.dumps(xml2json(...), ensure_ascii=ensure_ascii).
+    :return: str.
+    """
+    root = parsexml(xml, parser, strip_cdata, remove_comments, remove_pis, huge_tree)
+    return dumpelement(root, strip_cdata=strip_cdata,
+                       header=header, compact=compact, remove_blank_text=remove_blank_text, text_engine=text_engine,
+                       ensure_ascii=ensure_ascii)
+
+
+def xml2json_bytes(xml, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
+                   compact=False, remove_blank_text=True, text_engine='single_pass', ensure_ascii=True,
+                   huge_tree=False):
+    """
+    This function is xml2json_string with the JSON text encoded as UTF-8.
+    :return: bytes.
+    """
+    return xml2json_string(xml, parser, strip_cdata, remove_comments, remove_pis, header, compact, remove_blank_text,
+                           text_engine, ensure_ascii, huge_tree).encode('utf-8')
+
+
+def msgpackhead(major, length):
+    """
+    This function encodes a MessagePack header.
+    :param major: str, 'int' for a non-negative integer, or 'str', 'array' or 'map' for the length of one,
+    :param length: int, the integer or the length,
+    :return: bytes.
+    """
+    fixed, limit, codes = MSGPACK_HEADS[major]
+    if length < limit:
+        return bytes((fixed | length,))
+    for code, size in zip(codes, (1, 2, 4, 8)):
+        if code is not None and length < 1 << 8 * size:
+            return bytes((code,)) + length.to_bytes(size, 'big')
+    raise ValueError(f'The length {length} does not fit in MessagePack.')
+
+
+def cborhead(major, length):
+    """
+    This function encodes a CBOR header.
+    :param major: str, 'int' for a non-negative integer, or 'str', 'array' or 'map' for the length of one,
+    :param length: int, the integer or the length,
+    :return: bytes.
+    """
+    major = CBOR_MAJOR[major] << 5
+    if length < 24:
+        return bytes((major | length,))
+    for extra, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+        if length < 1 << 8 * size:
+            return bytes((major | extra,)) + length.to_bytes(size, 'big')
+    raise ValueError(f'The length {length} does not fit in CBOR.')
+
+
+def packvalue(value, head, key, binary_format='msgpack'):
+    """
+    This function encodes a small JSON value, such as an attribute mapping, in MessagePack or CBOR.
+    :param value: str, None, bool, or a list or mapping of them,
+    :param head: function, msgpackhead or cborhead,
+    :param key: function, encodes a mapping key,
+    :param binary_format: str, one of BINARY_FORMATS,
+    :return: bytes.
+    """
+    if isinstance(value, str):
+        encoded = value.encode('utf-8')
+        return head('str', len(encoded)) + encoded
+    if isinstance(value, Mapping):
+        return head('map', len(value)) + b''.join(key(name) + packvalue(item, head, key, binary_format)
+                                                   for name, item in value.items())
+    if isinstance(value, list):
+        return head('array', len(value)) + b''.join(packvalue(item, head, key, binary_format) for item in value)
+    if value is None or isinstance(value, bool):
+        return BINARY_CONSTANTS[binary_format][value]
+    raise TypeError(f'The value {value!r} has invalid type.')
+
+
+def dumpbinary(element, strip_cdata=False, header=True, compact=False, remove_blank_text=True,
+               text_engine='single_pass', binary_format='msgpack', key_table=False):
+    """
+    This function writes the xml-js format JSON of the element as MessagePack or CBOR, straight from the tree
+    like dumpelement. Decoding gives the same value as walkelement's output.
+    :param element: etree.ElementTree object,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per tree, 'tostring' serializes every element,
+    :param binary_format: str, one of BINARY_FORMATS,
+    :param key_table: bool, whether to write every name once: the output is then the array [keys, document], where
+                      keys lists the names and the document has their indices in place of all mapping keys and
+                      element names, see restorekeys; a MessagePack decoder needs integer keys allowed for it,
+                      e.g. msgpack.unpackb(data, strict_map_key=False),
+    :return: bytes.
+    """
+    if text_engine not in TEXT_ENGINES:
+        raise ValueError(f'The text engine must be one of {TEXT_ENGINES}.')
+    if binary_format not in BINARY_FORMATS:
+        raise ValueError(f'The binary format must be one of {BINARY_FORMATS}.')
+    timing = PROFILER.begin('serialize') if PROFILER is not None else None
+    cdata_index = CDataIndex(element) if text_engine == 'single_pass' else None
+    head = msgpackhead if binary_format == 'msgpack' else cborhead
+    # Most strings and containers are short, so their headers are looked up instead of encoded.
+    str_heads = [head('str', length) for length in range(256)]
+    map_heads = [head('map', length) for length in range(16)]
+    names = {}
+
+    def text(value):
+        encoded = value.encode('utf-8')
+        length = len(encoded)
+        return (str_heads[length] if length < 256 else head('str', length)) + encoded
+
+    def attributemap(attributes):
+        return (map_heads[len(attributes)] if len(attributes) < 16 else head('map', len(attributes))) + b''.join(
+            [name(key) + text(value) for key, value in attributes.items()])
+
+    def name(value):
+        encoded = names.get(value)
+        if encoded is None:
+            encoded = names[value] = head('int', len(names)) if key_table else text(value)
+        return encoded
+
+    def pack(value):
+        return packvalue(value, head, name, binary_format)
+
+    if not compact:
+        text_prefix = {cdata: map_heads[2] + name('type') + text(kind) + name(kind)
+                       for cdata, kind in ((False, 'text'), (True, 'cdata'))}
+        element_prefix = name('type') + text('element') + name('name')
+
+    def render(element, blank_text):
+        # Returns the encoding of the element as bytes, with children that have children of their own left in place.
+        if isinstance(element, LEAF_TYPES):
+            leaf_output = leafelement(element, strip_cdata, compact, cdata_index=cdata_index)
+            return [pack(next(iter(leaf_output.values())) if compact else leaf_output)]
+        texts = textnodes(element, strip_cdata, blank_text, cdata_index)
+        attributes = element.attrib
+        parts = []
+        if compact:
+            groups = {}
+            if attributes:
+                groups['_attributes'] = [attributemap(attributes)]
+            cdatas = []
+            for value, cdata in texts:
+                if cdata:
+                    cdatas.append(text(value))
+                else:
+                    groups.setdefault('_text', []).append(text(value))
+            if cdatas:
+                groups['_cdata'] = cdatas
+                if '_text' in groups:
+                    groups['_text'] = groups.pop('_text')
+            for child in element.iterchildren():
+                if isinstance(child, LEAF_TYPES):
+                    key = next(iter(leafelement(child, strip_cdata, compact).keys()))
+                else:
+                    key = child.tag
+                groups.setdefault(key, []).append(child)
+            parts.append(map_heads[len(groups)] if len(groups) < 16 else head('map', len(groups)))
+            for key, values in groups.items():
+                parts.append(name(key))
+                if len(values) > 1:
+                    parts.append(head('array', len(values)))
+                for value in values:
+                    if isinstance(value, bytes) or len(value):
+                        parts.append(value)
+                    else:
+                        parts.extend(render(value, True))
+        else:
+            children = element.getchildren()
+            values = [text_prefix[cdata] + text(value) for value, cdata in texts]
+            parts.append(map_heads[2 + bool(attributes) + bool(values or children)] + element_prefix +
+                         name(element.tag))
+            if attributes:
+                parts.append(name('attributes') + attributemap(attributes))
+            if values or children:
+                parts.append(name('elements') + head('array', len(values) + len(children)))
+                parts.extend(values)
+                for child in children:
+                    if len(child):
+                        parts.append(child)
+                    else:
+                        parts.extend(render(child, True))
+        return parts
+
+    buffer = [head('map', 1 + bool(header))]
+    if header:
+        key, node = declaration(compact)
+        buffer.append(name(key) + pack(node))
+    if compact:
+        buffer.append(name(element.tag))
+    else:
+        buffer.append(name('elements') + head('array', 1))
+    stack = [(element, topblanktext(element, remove_blank_text))]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, bytes):
+            buffer.append(item)
+        elif isinstance(item, tuple):
+            stack.extend(reversed(render(*item)))
+        else:
+            stack.extend(reversed(render(item, True)))
+    if key_table:
+        buffer[:0] = [head('array', 2), head('array', len(names))] + [text(key) for key in names]
+    data = b''.join(buffer)
+    if timing is not None:
+        PROFILER.end(timing)
+        PROFILER.serialized(data)
+    return data
+
+
+def restorekeys(data, compact=False):
+    """
+    This function turns a decoded key_table output of dumpbinary back into the xml-js format JSON.
+    :param data: list, the decoded [keys, document] array,
+    :param compact: bool, whether the document is in compact format,
+    :return: dict.
+    """
+    keys, document = data
+
+    def restore(value):
+        if isinstance(value, dict):
+            output = {keys[key] if isinstance(key, int) else key: restore(item) for key, item in value.items()}
+            if not compact and output.get('type') == 'element' and isinstance(output.get('name'), int):
+                output['name'] = keys[output['name']]
+            return output
+        if isinstance(value, list):
+            return [restore(item) for item in value]
+        return value
+
+    return restore(document)
+
+
+def xml2json_binary(xml, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
+                    compact=False, remove_blank_text=True, text_engine='single_pass', binary_format='msgpack',
+                    key_table=False, huge_tree=False):
+    """
+    This function parses the xml string and writes the xml-js format JSON as MessagePack or CBOR without building
+    the dict output, see dumpbinary. The other options are the same as xml2json.
+    :return: bytes.
+    """
+    root = parsexml(xml, parser, strip_cdata, remove_comments, remove_pis, huge_tree)
+    return dumpbinary(root, strip_cdata=strip_cdata,
+                      header=header, compact=compact, remove_blank_text=remove_blank_text, text_engine=text_engine,
+                      binary_format=binary_format, key_table=key_table)
+
+
+class ShapeMismatch(Exception):
+    pass
+
+
+class ElementShape(object):
+    """
+    This class records the child element tags an element may have, each with the shape of that child.
+    An open shape (xs:any) accepts unknown children, which are converted by the generic path.
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.open = False
+
+
+def sampleshape(element, shape=None):
+    """
+    This function merges the tag layout of a sample element into a shape.
+    :param element: etree._Element object,
+    :param shape: ElementShape object, the shape seen so far for elements at the same tag path,
+    :return: ElementShape object.
+    """
+    shape = shape or ElementShape()
+    for child in element.iterchildren(tag=etree.Element):
+        shape.children[child.tag] = sampleshape(child, shape.children.get(child.tag))
+    return shape
+
+
+def schemashapes(schema):
+    """
+    This function reads the element shapes declared by an XSD: sequences, choices, all, groups, element refs,
+    named and anonymous complex types and complexContent extensions. Includes and imports are not followed.
+    :param schema: etree._Element object, the xs:schema element,
+    :return: dict of the global element tags to ElementShape objects.
+    """
+    xs = '{http://www.w3.org/2001/XMLSchema}'
+    target = schema.get('targetNamespace')
+    qualified = schema.get('elementFormDefault') == 'qualified'
+    types = {node.get('name'): node for node in schema.iterchildren(xs + 'complexType')}
+    groups = {node.get('name'): node for node in schema.iterchildren(xs + 'group')}
+    elements = {node.get('name'): node for node in schema.iterchildren(xs + 'element')}
+    typeshapes = {}
+
+    def local(name):
+        return name.split(':')[-1]
+
+    def qname(name, form):
+        return f'{{{target}}}{name}' if target and form else name
+
+    def content(node, shape):
+        for item in node.iterchildren(tag=etree.Element):
+            if item.tag == xs + 'element':
+                if item.get('ref'):
+                    declaration = elements.get(local(item.get('ref')))
+                    if declaration is None:
+                        shape.open = True
+                        continue
+                    shape.children[qname(declaration.get('name'), True)] = elementshape(declaration)
+                else:
+                    form = item.get('form', 'qualified' if qualified else 'unqualified') == 'qualified'
+                    shape.children[qname(item.get('name'), form)] = elementshape(item)
+            elif item.tag == xs + 'any':
+                shape.open = True
+            elif item.tag == xs + 'group' and item.get('ref'):
+                content(groups.get(local(item.get('ref')), item), shape)
+            elif item.tag == xs + 'extension' and local(item.get('base', '')) in types:
+                content(types[local(item.get('base'))], shape)
+                content(item, shape)
+            elif item.tag in (xs + 'sequence', xs + 'choice', xs + 'all', xs + 'group', xs + 'complexContent',
+                              xs + 'extension', xs + 'restriction'):
+                content(item, shape)
+
+    def elementshape(declaration):
+        type_name = local(declaration.get('type', ''))
+        if type_name in types:
+            # Named types are shared and may be recursive, so the shape is registered before it is filled.
+            if type_name not in typeshapes:
+                typeshapes[type_name] = ElementShape()
+                content(types[type_name], typeshapes[type_name])
+            return typeshapes[type_name]
+        shape = ElementShape()
+        for complex_type in declaration.iterchildren(xs + 'complexType'):
+            content(complex_type, shape)
+        return shape
+
+    return {qname(name, True): elementshape(declaration) for name, declaration in elements.items()}
+
+
+def plaintext(element, children, remove_blank_text=True):
+    """
+    This function is the compact text of an element whose tree holds no CDATA: its text and its children's tails.
+    :param element: etree._Element object,
+    :param children: list, the children of the element,
+    :param remove_blank_text: bool, whether to remove empty text,
+    :return: str, list of str or None.
+    """
+    texts = [element.text] if element.text is not None else []
+    texts.extend(child.tail for child in children if child.tail is not None)
+    texts = [text.strip() for text in texts]
+    if remove_blank_text:
+        texts = [text for text in texts if text]
+    if not texts:
+        return None
+    return texts[0] if len(texts) == 1 else texts
+
+
+def shapeconverter(shape, strip_cdata=False, dict_type=DEFAULT_DICT, converters=None):
+    """
+    This function builds the compact conversion function of a shape. Every known child tag is dispatched straight to
+    the converter of its own shape; an unknown child raises ShapeMismatch unless the shape is open.
+    :param shape: ElementShape object,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param dict_type: type, the mapping type of every JSON object in the output,
+    :param converters: dict, the converters built so far by shape id, shared by the recursive calls,
+    :return: function taking an etree._Element object and remove_blank_text, and returning its compact node.
+    """
+    converters = {} if converters is None else converters
+    if id(shape) in converters:
+        return converters[id(shape)]
+    dispatch = {etree.Comment: ('_comment', lambda child: child.text),
+                etree.PI: ('_instruction', lambda child: leafelement(child, strip_cdata, True,
+                                                                     dict_type=dict_type)['_instruction'])}
+    is_open = shape.open
+
+    def convert(element, remove_blank_text=True):
+        node = dict_type()
+        if element.attrib:
+            node['_attributes'] = dict_type(element.attrib)
+        if not len(element):
+            text = element.text
+            if text is not None:
+                text = text.strip()
+                if text:
+                    node['_text'] = text
+            return node
+        children = element.getchildren()
+        text = plaintext(element, children, remove_blank_text)
+        if text is not None:
+            node['_text'] = text
+        for child in children:
+            entry = dispatch.get(child.tag)
+            if entry is not None:
+                compactinsert(node, entry[0], entry[1](child))
+            elif is_open and not isinstance(child, etree._Entity):
+                output = parseelement(child, strip_cdata, False, True, cdata_index=CDataIndex(child, False),
+                                      dict_type=dict_type)
+                if isinstance(output, Exception):
+                    raise output
+                for key, value in output.items():
+                    compactinsert(node, key, value)
+            else:
+                raise ShapeMismatch(f'Unexpected child {child.tag!r} in {element.tag!r}.')
+        return node
+
+    converters[id(shape)] = convert
+    for tag, child_shape in shape.children.items():
+        dispatch[tag] = (tag, shapeconverter(child_shape, strip_cdata, dict_type, converters))
+    return convert
+
+
+class CompiledConverter(object):
+    """
+    This class converts documents of a known shape to compact xml-js format JSON, see compile_converter.
+    A document that leaves the shape (an unknown tag, an entity reference or CDATA) is converted by the generic
+    path instead, so the output is always the same as xml2json; hits and misses are counted.
+    """
+
+    def __init__(self, shapes, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
+                 remove_blank_text=True, dict_type=DEFAULT_DICT):
+        """
+        :param shapes: dict of root tags to ElementShape objects,
+        The other parameters are the options of xml2json, see compile_converter.
+        """
+        converters = {}
+        self.roots = {tag: shapeconverter(shape, strip_cdata, dict_type, converters) for tag, shape in shapes.items()}
+        self.parser = parser
+        self.strip_cdata = strip_cdata
+        self.remove_comments = remove_comments
+        self.remove_pis = remove_pis
+        self.header = header
+        self.remove_blank_text = remove_blank_text
+        self.dict_type = dict_type
+        # The cached parser merges CDATA into plain text when strip_cdata is set, so it cannot split the texts.
+        self.cdata_safe = parser is None and strip_cdata
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """
+        This function reports how many documents took the compiled path.
+        :return: dict of hits, misses and hit_ratio.
+        """
+        return dict(hits=self.hits, misses=self.misses, hit_ratio=self.hit_ratio)
+
+    def convert(self, root, cdata=False):
+        """
+        This function converts a parsed document, falling back to walkelement when it leaves the shape.
+        :param root: etree._Element object,
+        :param cdata: bool, whether the document may hold CDATA sections,
+        :return: dict_type().
+        """
+        convert = self.roots.get(root.tag)
+        if convert is not None and not cdata:
+            try:
+                node = convert(root, topblanktext(root, self.remove_blank_text))
+            except ShapeMismatch:
+                pass
+            else:
+                self.hits += 1
+                output = outputroot(self.header, True, self.dict_type)[0]
+                output[root.tag] = node
+                return output
+        self.misses += 1
+        return walkelement(root, strip_cdata=self.strip_cdata, header=self.header, compact=True,
+                           remove_blank_text=self.remove_blank_text, dict_type=self.dict_type)
+
+    def __call__(self, xml):
+        """
+        This function parses the xml document and converts it.
+        :param xml: str or bytes, the xml document, an os.PathLike path to it, or a buffer holding it, see parsexml,
+        :return: dict_type().
+        """
+        if isinstance(xml, os.PathLike):
+            with mapfile(xml) as data:
+                return self(data)
+        root = parsexml(xml, self.parser, self.strip_cdata, self.remove_comments, self.remove_pis)
+        if self.cdata_safe:
+            return self.convert(root)
+        if isinstance(xml, str):
+            return self.convert(root, '<![CDATA[' in xml)
+        # re searches buffers in place, so a mapped file is not copied for the check.
+        return self.convert(root, re.search(rb'<!\[CDATA\[', xml) is not None)
+
+
+def compile_converter(sample, parser=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
+                      remove_blank_text=True, dict_type=None):
+    """
+    This function compiles a compact xml2json converter specialized for the shape of a sample document or an XSD.
+    The converter knows every tag path up front, so it skips the CDATA index, the per-element text discovery and
+    the error wrapping of the generic path; documents that deviate from the shape are converted generically.
+    :param sample: str or bytes, a sample xml document or an XSD, or a list of them whose shapes are merged,
+    :param parser: etree.XMLParser object, taken from this thread's parser cache if not given,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param header: bool, whether to include header info in the JSON,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param dict_type: type, the mapping type of every JSON object in the output, dict on Python 3.7+ by default,
+    :return: CompiledConverter object, call it with an xml document.
+    """
+    shapes = {}
+    for document in (sample if isinstance(sample, (list, tuple)) else [sample]):
+        root = parsexml(document, parser, strip_cdata, remove_comments, remove_pis)
+        if root.tag == '{http://www.w3.org/2001/XMLSchema}schema':
+            shapes.update(schemashapes(root))
+        else:
+            shapes[root.tag] = sampleshape(root, shapes.get(root.tag))
+    return CompiledConverter(shapes, parser, strip_cdata, remove_comments, remove_pis, header, remove_blank_text,
+                             dict_type or DEFAULT_DICT)
+
+
+def _initworker(options):
+    """
+    This function prepares a pool worker: the parser is built once and reused for every document it converts.
+    :param options: dict, the keyword options given to xml2json_many.
+    """
+    WORKER_STATE.update(options=options, names=NameTable(NAME_TABLE_SIZE),
+                        parser=cachedparser(remove_comments=options['remove_comments'],
+                                            remove_pis=options['remove_pis'], strip_cdata=options['strip_cdata'],
+                                            huge_tree=options['huge_tree']))
+
+
+def _convertbatch(batch, start=0):
+    """
+    This function converts a batch of documents inside a pool worker.
+    :param batch: list of str or bytes,
+    :param start: int, the index of the batch's first document in the input,
+    :return: list of dicts or, when serialize is set, list of str, with a ConversionError for a failing document.
+    """
+    options = dict(WORKER_STATE['options'])
+    ensure_ascii = options.pop('ensure_ascii')
+    # huge_tree is a parser option and the worker's parser is built with it.
+    options.pop('huge_tree')
+    if options.pop('serialize'):
+        options.pop('dict_type')
+        convert = partial(xml2json_string, parser=WORKER_STATE['parser'], ensure_ascii=ensure_ascii, **options)
+    else:
+        # The worker's name table makes the documents of a batch share their name strings, which pickling keeps.
+        convert = partial(xml2json, parser=WORKER_STATE['parser'], names=WORKER_STATE['names'], errors='strict',
+                          **options)
+    results = []
+    for index, xml in enumerate(batch, start):
+        try:
+            results.append(convert(xml))
+        except ConversionError as e:
+            results.append(ConversionError(e.message, e.path, e.line, index))
+        except Exception as e:
+            # lxml's syntax errors cannot be pickled back to the caller, so they travel as a ConversionError.
+            results.append(ConversionError(f'{type(e).__name__}: {e}', None, getattr(e, 'lineno', None), index))
+    return results
+
+
+def xml2json_many(xmls, workers=None, chunksize=16, ordered=True, serialize=False, strip_cdata=False,
+                  remove_comments=False, remove_pis=False, header=True, compact=False, remove_blank_text=True,
+                  text_engine='single_pass', dict_type=None, ensure_ascii=True, huge_tree=False):
+    """
+    This function converts many xml documents over a process pool.
+    Documents are sent in chunks and at most two chunks per worker are in flight, so xmls may be an endless stream.
+    :param xmls: iterable of str or bytes,
+    :param workers: int, the number of worker processes, os.cpu_count() if not given,
+    :param chunksize: int, the number of documents sent to a worker at a time,
+    :param ordered: bool, whether to yield results in input order, or (index, result) tuples as they complete,
+    :param serialize: bool, whether workers return JSON text from xml2json_string instead of dicts,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per tree, 'tostring' serializes every element,
+    :param dict_type: type, the mapping type of every JSON object in the output, dict on Python 3.7+ by default,
+    :param ensure_ascii: bool, whether serialized JSON escapes all non-ASCII characters,
+    :param huge_tree: bool, whether to lift libxml2's depth and size limits, see parsexml,
+    :return: generator of dicts or str, or of (int, result) tuples when ordered is False; a document that fails to
+             parse or convert gives a ConversionError with its message, line and index instead, and the rest go on.
+    """
+    if chunksize < 1:
+        raise ValueError('The chunksize must be at least 1.')
+    workers = workers or os.cpu_count() or 1
+    options = dict(serialize=serialize, strip_cdata=strip_cdata, remove_comments=remove_comments,
+                   remove_pis=remove_pis, header=header, compact=compact, remove_blank_text=remove_blank_text,
+                   text_engine=text_engine, dict_type=dict_type, ensure_ascii=ensure_ascii, huge_tree=huge_tree)
+    xmls = iter(xmls)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initworker, initargs=(options,)) as executor:
+        pending = deque() if ordered else {}
+        start = 0
+        try:
+            while True:
+                while len(pending) < 2 * workers:
+                    batch = list(islice(xmls, chunksize))
+                    if not batch:
+                        break
+                    future = executor.submit(_convertbatch, batch, start)
+                    if ordered:
+                        pending.append(future)
+                    else:
+                        pending[future] = start
+                    start += len(batch)
+                if not pending:
+                    break
+                if ordered:
+                    yield from pending.popleft().result()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from enumerate(future.result(), pending.pop(future))
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _initpartition(options, head, tail, path):
+    """
+    This function prepares a pool worker of xml2json_parallel.
+    :param options: dict, the conversion options,
+    :param head: bytes, the prolog and the root start tag that wrap every partition,
+    :param tail: bytes, the root end tag,
+    :param path: str, the document file the partitions are read from, None when they are sent as bytes.
+    """
+    WORKER_STATE.update(options=options, head=head, tail=tail, path=path,
+                        parser=cachedparser(remove_comments=options['remove_comments'],
+                                            remove_pis=options['remove_pis'], strip_cdata=options['strip_cdata'],
+                                            huge_tree=options['huge_tree']))
+
+
+def _convertpartition(partition):
+    """
+    This function converts the records of one partition inside a pool worker, wrapped in the root element.
+    :param partition: (int, int) tuple of the byte range in the file, or bytes,
+    :return: (str, dict, list, list) tuple of the root tag, the root attributes, the root's (text, cdata) pairs
+             and the converted children, (key, value) tuples in compact format, or None if the range is not
+             well-formed.
+    """
+    options = WORKER_STATE['options']
+    if WORKER_STATE['path'] is not None:
+        start, end = partition
+        with open(WORKER_STATE['path'], 'rb') as f:
+            f.seek(start)
+            partition = f.read(end - start)
+    try:
+        root = etree.fromstring(WORKER_STATE['head'] + partition + WORKER_STATE['tail'], parser=WORKER_STATE['parser'])
+    except etree.XMLSyntaxError:
+        # lxml's syntax errors cannot be pickled back to the caller, and the caller only needs to know to fall back.
+        return None
+    cdata_index = CDataIndex(root) if options['text_engine'] == 'single_pass' else None
+    texts = list(textnodes(root, options['strip_cdata'], options['remove_blank_text'], cdata_index))
+    children = []
+    # One table for the partition, so its records share their name strings, which pickling keeps.
+    names = NameTable(NAME_TABLE_SIZE)
+    for child in root.iterchildren():
+        output = parseelement(child, options['strip_cdata'], False, options['compact'],
+                              text_engine=options['text_engine'], cdata_index=cdata_index,
+                              dict_type=options['dict_type'], names=names)
+        if isinstance(output, Exception):
+            raise output
+        children.extend(output.items() if options['compact'] else output['elements'])
+    return root.tag, dict(root.attrib), texts, children
+
+
+def partitionxml(data, tag=None, partitions=2):
+    """
+    This function splits the body of the root element into byte ranges that start at a record start tag.
+    The scan is a plain byte search, so a boundary may land in a comment, CDATA or a nested record; such a
+    partition is not well-formed on its own and the caller falls back to one parse.
+    :param data: bytes, bytearray or mmap.mmap object, the document,
+    :param tag: str, the record tag as written in the document, e.g. 'item' or 'ns:item',
+                the first child's if not given,
+    :param partitions: int, the number of ranges wanted,
+    :return: (bytes, bytes, list) tuple of the head, the tail and the (start, end) ranges, or None if the document
+             cannot be split.
+    """
+    prolog = XML_PROLOG.match(data)
+    root = START_TAG.match(data, prolog.end())
+    if root is None or root.group().endswith(b'/>'):
+        return None
+    body_start = root.end()
+    body_end = data.rfind(b'</')
+    if body_end < body_start:
+        return None
+    if tag is None:
+        first = START_TAG.search(data, body_start, body_end)
+        if first is None:
+            return None
+        tag = first.group(1)
+    else:
+        tag = tag.encode('utf-8')
+    record = re.compile(b'<' + re.escape(tag) + rb'[\s/>]')
+    step = (body_end - body_start) // partitions
+    bounds = [body_start]
+    for index in range(1, partitions):
+        match = record.search(data, max(body_start + index * step, bounds[-1] + 1), body_end)
+        if match is None:
+            break
+        bounds.append(match.start())
+    bounds.append(body_end)
+    head = bytes(data[:body_start])
+    tail = b'</' + root.group(1) + b'>'
+    return head, tail, list(zip(bounds, bounds[1:]))
+
+
+def xml2json_parallel(source, tag=None, workers=None, partitions=None, strip_cdata=False, remove_comments=False,
+                      remove_pis=False, header=True, compact=False, remove_blank_text=True, text_engine='single_pass',
+                      huge_tree=False, dict_type=None):
+    """
+    This function converts one large record-oriented document over a process pool.
+    The byte stream is cut at record start tags among the root's children; every worker parses its range wrapped
+    in the root's prolog and start tag, converts the records with parseelement and the results are joined in
+    order, so the output is the same as xml2json. If a range is not well-formed on its own (a cut inside a
+    comment, CDATA or nested record) the document is converted by a single parse instead.
+    :param source: str or os.PathLike path, or bytes, bytearray, memoryview or mmap.mmap object, the document,
+    :param tag: str, the record tag as written in the document, e.g. 'item' or 'ns:item',
+                the first child's if not given,
+    :param workers: int, the number of worker processes, os.cpu_count() if not given,
+    :param partitions: int, the number of byte ranges, four per worker if not given,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per range, 'tostring' serializes every element,
+    :param huge_tree: bool, whether to lift libxml2's depth and size limits,
+    :param dict_type: type, the mapping type of every JSON object in the output, dict on Python 3.7+ by default,
+    :return: dict_type().
+    """
+    if text_engine not in TEXT_ENGINES:
+        raise ValueError(f'The text engine must be one of {TEXT_ENGINES}.')
+    workers = workers or os.cpu_count() or 1
+    dict_type = dict_type or DEFAULT_DICT
+    options = dict(strip_cdata=strip_cdata, remove_comments=remove_comments, remove_pis=remove_pis,
+                   compact=compact, remove_blank_text=remove_blank_text, text_engine=text_engine,
+                   huge_tree=huge_tree, dict_type=dict_type)
+    if isinstance(source, (str, os.PathLike)):
+        path = source
+    elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        path = None
+        if isinstance(source, memoryview):
+            # The byte search needs rfind, which memoryview lacks.
+            source = source.tobytes()
+    else:
+        raise TypeError(f'The source must be a path or a bytes-like object, not {type(source).__name__}.')
+    if path is None:
+        split = partitionxml(source, tag, partitions or 4 * workers)
+    else:
+        # The scan reads the file through a memory map, so only the pages it touches are loaded.
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            split = partitionxml(data, tag, partitions or 4 * workers)
+    results = None
+    if split is not None and len(split[2]) > 1:
+        head, tail, ranges = split
+        tasks = ranges if path is not None else [bytes(source[start:end]) for start, end in ranges]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initpartition,
+                                 initargs=(options, head, tail, path)) as executor:
+            results = list(executor.map(_convertpartition, tasks))
+    if results is None or None in results:
+        parser = cachedparser(remove_comments=remove_comments, remove_pis=remove_pis, strip_cdata=strip_cdata,
+                              huge_tree=huge_tree)
+        root = etree.parse(path, parser).getroot() if path is not None else parsexml(source, parser)
+        return walkelement(root, strip_cdata=strip_cdata, header=header, compact=compact,
+                           remove_blank_text=remove_blank_text, text_engine=text_engine, dict_type=dict_type)
+
+    root_tag, attributes = results[0][:2]
+    text_output = textoutput((text for result in results for text in result[2]), compact, dict_type)
+    output, container = outputroot(header, compact, dict_type)
+    if compact:
+        node = output[root_tag] = dict_type()
+        if attributes:
+            node.update(_attributes=dict_type(attributes))
+        if text_output:
+            node.update(text_output)
+        for result in results:
+            for key, value in result[3]:
+                compactinsert(node, key, value)
+    else:
+        node = dict_type(type='element', name=root_tag)
+        if attributes:
+            node.update(attributes=dict_type(attributes))
+        node.update(elements=text_output or [])
+        for result in results:
+            node['elements'].extend(result[3])
+        container.append(node)
+    return output
+
+
+def recordmatcher(tag):
+    """
+    This function builds the record test used by the streaming converters.
+    :param tag: str, a tag name matched at any depth, or a slash-separated path from the root element
+                such as 'catalog/product' ('*' matches any tag, namespaces use '{uri}name'),
+    :return: function taking the list of open tags and returning whether the innermost one is a record.
+    """
+    path = PATH_STEP.findall(tag)
+    if len(path) == 1 and not tag.startswith('/'):
+        return lambda tags: tags[-1] == tag
+    return lambda tags: len(tags) == len(path) and all(step in ('*', name) for step, name in zip(path, tags))
+
+
+class RecordConverter(object):
+    """
+    This class converts the record elements found in a stream of ('start', element) and ('end', element) events.
+    Converted records, and every element ending outside a record, are removed from the tree with their preceding
+    siblings, so memory stays flat at any record depth.
+    Records nested inside another record are converted as part of the outer one.
+    """
+
+    def __init__(self, tag=None, converter=walkelement, **options):
+        """
+        :param tag: str, the record tag or path, see recordmatcher; the children of the root element if not given,
+        :param converter: function, converts a record element, walkelement by default, e.g. dumpelement for JSON text,
+        :param options: keyword options of the converter.
+        """
+        self.is_record = recordmatcher(tag) if tag else (lambda tags: len(tags) == 2)
+        self.converter = converter
+        if converter is walkelement and options.get('names') is None:
+            # One bounded table serves the whole stream, so every record shares the same name strings.
+            options['names'] = NameTable(NAME_TABLE_SIZE)
+        self.options = options
+        self.tags = []
+        self.record_depth = 0
+
+    def convert(self, events):
+        """
+        This function consumes parse events and yields the xml-js format JSON of every completed record.
+        :param events: iterable of (str, etree._Element) tuples,
+        :return: generator of the converter's results, dicts by default.
+        """
+        tags = self.tags
+        for event, element in events:
+            if event == 'start':
+                tags.append(element.tag)
+                if self.record_depth or self.is_record(tags):
+                    self.record_depth += 1
+                continue
+            converted = False
+            if self.record_depth:
+                self.record_depth -= 1
+                if not self.record_depth:
+                    output = self.converter(element, **self.options)
+                    converted = True
+            if not self.record_depth:
+                # Every element ending outside a record, ancestors of nested records included, is cleared with
+                # its preceding siblings, so the tree stays small whatever the depth of the records.
+                element.clear(keep_tail=True)
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+            tags.pop()
+            if converted:
+                yield output
+
+
+def xml2json_iter(source, tag, strip_cdata=False, remove_comments=False, remove_pis=False, header=False,
+                  compact=False, remove_blank_text=True, text_engine='single_pass', huge_tree=False, dict_type=None,
+                  errors='return'):
+    """
+    This function streams an xml file and yields the xml-js format JSON of every record element.
+    Converted records and the elements around them are removed from the tree, so memory stays flat.
+    Records nested inside another record are converted as part of the outer one.
+    :param source: str path or file object opened in binary mode,
+    :param tag: str, the record tag or path, see recordmatcher,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param header: bool, whether to include header info in each record's JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per record, 'tostring' serializes every element,
+    :param huge_tree: bool, whether to lift libxml2's depth and size limits,
+    :param dict_type: type, the mapping type of every JSON object in the output, dict on Python 3.7+ by default,
+    :param errors: str or list, how a failing element of a record is handled, see walkelement; with a list the
+                   stream carries on past bad elements,
+    :return: generator of dict_type().
+    """
+    records = RecordConverter(tag, strip_cdata=strip_cdata, header=header, compact=compact,
+                              remove_blank_text=remove_blank_text, text_engine=text_engine,
+                              dict_type=dict_type or DEFAULT_DICT, errors=errors)
+    yield from records.convert(etree.iterparse(source, events=('start', 'end'), remove_comments=remove_comments,
+                                               remove_pis=remove_pis, strip_cdata=strip_cdata, huge_tree=huge_tree))
+
+
+class FeedConverter(object):
+    """
+    This class converts xml that arrives in chunks, e.g. from a socket, on top of etree.XMLPullParser.
+    Each feed() returns the records completed by that chunk, so conversion overlaps with I/O
+    and only the unfinished record is buffered.
+    """
+
+    def __init__(self, tag=None, strip_cdata=False, remove_comments=False, remove_pis=False, header=False,
+                 compact=False, remove_blank_text=True, text_engine='single_pass', huge_tree=False, dict_type=None):
+        """
+        :param tag: str, the record tag or path, see recordmatcher; the children of the root element if not given,
+        :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+        :param remove_comments: bool, whether to drop comments,
+        :param remove_pis: bool, whether to drop processing instructions,
+        :param header: bool, whether to include header info in each record's JSON,
+        :param compact: bool, whether output JSON in compact format,
+        :param remove_blank_text: bool, whether to remove empty text from all text fields,
+        :param text_engine: str, 'single_pass' indexes CDATA once per record, 'tostring' serializes every element,
+        :param huge_tree: bool, whether to lift libxml2's depth and size limits,
+        :param dict_type: type, the mapping type of every JSON object in the output, dict on Python 3.7+ by default.
+        """
+        self.records = RecordConverter(tag, strip_cdata=strip_cdata, header=header, compact=compact,
+                                       remove_blank_text=remove_blank_text, text_engine=text_engine,
+                                       dict_type=dict_type or DEFAULT_DICT)
+        self.parser = etree.XMLPullParser(events=('start', 'end'), remove_comments=remove_comments,
+                                          remove_pis=remove_pis, strip_cdata=strip_cdata, huge_tree=huge_tree)
+
+    def feed(self, chunk):
+        """
+        This function parses the next chunk of the document.
+        :param chunk: str or bytes,
+        :return: list of dicts, the records completed by this chunk.
+        """
+        self.parser.feed(chunk)
+        return list(self.records.convert(self.parser.read_events()))
+
+    def close(self):
+        """
+        This function finishes the document; it raises etree.XMLSyntaxError if the document is incomplete.
+        :return: list of dicts, the records completed at the end of the document.
+        """
+        self.parser.close()
+        return list(self.records.convert(self.parser.read_events()))
+
+
+def selectmatcher(select, root=None):
+    """
+    This function builds the selection test used by SelectionConverter.
+    A selector made only of names, '{uri}name' and '*' steps is a tag path, see recordmatcher;
+    anything else is an XPath expression evaluated on root.
+    :param select: str or list of str, the selectors,
+    :param root: etree._Element object, required for XPath selectors,
+    :return: function taking the list of open tags and the element and returning whether it is selected.
+    """
+    if isinstance(select, str):
+        select = [select]
+    tag_paths = [recordmatcher(selector) for selector in select if TAG_PATH.match(selector)]
+    xpaths = [selector for selector in select if not TAG_PATH.match(selector)]
+    if xpaths and root is None:
+        raise ValueError(f'XPath selectors need the whole tree, streaming selection takes tag paths only: {xpaths}.')
+    selected = set()
+    for selector in xpaths:
+        selected.update(node for node in root.xpath(selector) if isinstance(node, etree._Element))
+    return lambda tags, element: element in selected or any(is_selected(tags) for is_selected in tag_paths)
+
+
+class SelectionConverter(object):
+    """
+    This class converts only the selected subtrees found in a stream of start and end events, wrapped in their
+    ancestors, so the result is a valid xml-js structure of the document pruned to the selection.
+    Ancestors keep their attributes but not their text, and selections nested in a selection are part of it.
+    Unselected elements are never converted; with clear set they are also removed from the tree when they end.
+    """
+
+    def __init__(self, is_selected, clear=False, header=True, compact=False, dict_type=DEFAULT_DICT, **options):
+        """
+        :param is_selected: function, see selectmatcher,
+        :param clear: bool, whether to remove finished elements from the tree, for iterparse input,
+        :param header: bool, whether to include header info in the JSON,
+        :param compact: bool, whether output JSON in compact format,
+        :param dict_type: type, the mapping type of every JSON object in the output,
+        :param options: other keyword options of walkelement.
+        """
+        self.is_selected = is_selected
+        self.clear = clear
+        self.compact = compact
+        self.dict_type = dict_type
+        self.options = dict(options, header=False, compact=compact, dict_type=dict_type)
+        if self.options.get('names') is None:
+            self.options['names'] = NameTable()
+        self.always_array = arraykeys(options.get('always_array'))
+        self.output, self.root = outputroot(header, compact, dict_type)
+        self.tags = []
+        self.elements = []
+        self.nodes = []
+        self.depth = 0
+
+    def container(self, depth):
+        """
+        This function returns where the children of the depth-th open element go, creating the ancestor
+        skeleton nodes on first use.
+        :param depth: int, the number of open elements to wrap in,
+        :return: dict in compact format, list otherwise.
+        """
+        container = self.root
+        for index in range(depth):
+            if self.nodes[index] is None:
+                element = self.elements[index]
+                if self.compact:
+                    node = self.dict_type()
+                    if element.attrib:
+                        node.update(_attributes=self.dict_type(element.attrib))
+                    compactinsert(container, element.tag, node, self.always_array)
+                    self.nodes[index] = node
+                else:
+                    node = self.dict_type(type='element', name=element.tag)
+                    if element.attrib:
+                        node.update(attributes=self.dict_type(element.attrib))
+                    node.update(elements=[])
+                    container.append(node)
+                    self.nodes[index] = node['elements']
+            container = self.nodes[index]
+        return container
+
+    def convert(self, events):
+        """
+        This function consumes parse events and converts the selected subtrees.
+        :param events: iterable of (str, etree._Element) tuples,
+        :return: dict_type(), the output so far, or the exception of a failing subtree when errors is 'return'.
+        """
+        for event, element in events:
+            if event == 'start':
+                self.tags.append(element.tag)
+                self.elements.append(element)
+                self.nodes.append(None)
+                if self.depth or self.is_selected(self.tags, element):
+                    self.depth += 1
+                continue
+            if self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    output = walkelement(element, **self.options)
+                    if isinstance(output, Exception):
+                        return output
+                    container = self.container(len(self.elements) - 1)
+                    if self.compact:
+                        for key, value in output.items():
+                            # Under always_array the subtree comes back in a list already; insert its item.
+                            for item in value if isinstance(value, list) else [value]:
+                                compactinsert(container, key, item, self.always_array)
+                    else:
+                        container.extend(output['elements'])
+            if self.clear and not self.depth:
+                element.clear(keep_tail=True)
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+            self.tags.pop()
+            self.elements.pop()
+            self.nodes.pop()
+        return self.output
+
+
+def xml2json_select(source, select, strip_cdata=False, remove_comments=False, remove_pis=False, header=True,
+                    compact=False, remove_blank_text=True, text_engine='single_pass', huge_tree=False,
+                    dict_type=None):
+    """
+    This function is the streaming counterpart of xml2json(..., select=select) for files.
+    Only the selected subtrees are kept in memory: every other element is removed from the tree when it ends.
+    :param source: str path or file object opened in binary mode,
+    :param select: str or list of str, tag paths, see recordmatcher,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param header: bool, whether to include header info in the JSON,
+    :param compact: bool, whether output JSON in compact format,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per subtree, 'tostring' serializes every element,
+    :param huge_tree: bool, whether to lift libxml2's depth and size limits,
+    :param dict_type: type, the mapping type of every JSON object in the output, dict on Python 3.7+ by default,
+    :return: dict_type(), or the exception of a failing subtree.
+    """
+    selection = SelectionConverter(selectmatcher(select), clear=True, strip_cdata=strip_cdata, header=header,
+                                   compact=compact, remove_blank_text=remove_blank_text, text_engine=text_engine,
+                                   dict_type=dict_type or DEFAULT_DICT)
+    return selection.convert(etree.iterparse(source, events=('start', 'end'), remove_comments=remove_comments,
+                                             remove_pis=remove_pis, strip_cdata=strip_cdata, huge_tree=huge_tree))
+
+
+def optionalmodule(name, extra):
+    """
+    This function imports an optional dependency on first use, so importing xml2js does not require or load it.
+    :param name: str, the module name,
+    :param extra: str, the setup.py extra that installs it,
+    :return: module.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError(f'{name} is required for this function, install it with: pip install xml2js[{extra}]') from e
+
+
+def flattenrecord(node, sep='.', row=None, path='', repeated=False):
+    """
+    This function flattens the compact JSON node of a record into one table row.
+    Columns are named by the xml-js compact keys on the path joined with sep, e.g. '_attributes.id' or 'name._text'.
+    Values below a repeated element, and repeated texts, are collected into lists in document order.
+    :param node: dict, the compact JSON node of the record,
+    :param sep: str, the separator of the keys in a column name,
+    :param row: dict, the row filled by the recursive calls,
+    :param path: str, the column name of node, empty for the record itself,
+    :param repeated: bool, whether node is below a repeated element,
+    :return: dict, the column names and values.
+    """
+    row = {} if row is None else row
+    for key, value in node.items():
+        column = path + sep + key if path else key
+        if isinstance(value, Mapping):
+            flattenrecord(value, sep, row, column, repeated)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, Mapping):
+                    flattenrecord(item, sep, row, column, True)
+                else:
+                    row.setdefault(column, []).append(item)
+        elif repeated:
+            row.setdefault(column, []).append(value)
+        else:
+            row[column] = value
+    return row
+
+
+def arrowschema(rows):
+    """
+    This function infers the Arrow schema of flattened records, see flattenrecord.
+    Columns keep their first-seen order; a column that holds a list in any row becomes a list column, and one that
+    is always missing, or mixes types Arrow cannot unify such as numbers and strings, becomes a string column.
+    :param rows: list of dict, the sampled rows,
+    :return: pyarrow.Schema object.
+    """
+    pyarrow = optionalmodule('pyarrow', 'arrow')
+    columns = {}
+    for row in rows:
+        for column, value in row.items():
+            values = columns.setdefault(column, [[], False])
+            if isinstance(value, list):
+                values[0].extend(value)
+                values[1] = True
+            else:
+                values[0].append(value)
+    fields = []
+    for column, (values, repeated) in columns.items():
+        try:
+            value_type = pyarrow.array(values).type
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            value_type = pyarrow.string()
+        if pyarrow.types.is_null(value_type):
+            value_type = pyarrow.string()
+        fields.append(pyarrow.field(column, pyarrow.list_(value_type) if repeated else value_type))
+    return pyarrow.schema(fields)
+
+
+def arrowtext(value):
+    """
+    This function writes a value into a string column, with booleans spelled as in JSON.
+    :param value: str, int, float, Decimal, bool or None,
+    :return: str or None.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def arrowintegral(values, repeated=False):
+    """
+    This function checks the values of an integer column, into which pyarrow would truncate floats silently.
+    :param values: list, the column values, lists of them in a list column,
+    :param repeated: bool, whether the column is a list column,
+    :return: bool, whether every value is an int or None.
+    """
+    if repeated:
+        values = [item for value in values if isinstance(value, list) for item in value]
+    return all(value is None or isinstance(value, int) for value in values)
+
+
+def arrowbatch(rows, schema):
+    """
+    This function builds a RecordBatch column by column, for rows that do not convert with the schema as a whole.
+    Values that are not strings are written as text into string columns; any other mismatch raises a ValueError
+    naming the column.
+    :param rows: list of dict, the flattened rows,
+    :param schema: pyarrow.Schema object,
+    :return: pyarrow.RecordBatch object.
+    """
+    pyarrow = optionalmodule('pyarrow', 'arrow')
+    arrays = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        repeated = pyarrow.types.is_list(field.type)
+        value_type = field.type.value_type if repeated else field.type
+        try:
+            if pyarrow.types.is_integer(value_type) and not arrowintegral(values, repeated):
+                raise pyarrow.ArrowInvalid('a value that is not an integer would be truncated')
+            arrays.append(pyarrow.array(values, type=field.type))
+            continue
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+            error = e
+        if pyarrow.types.is_string(value_type) and (repeated or not any(isinstance(value, list) for value in values)):
+            if repeated:
+                values = [None if value is None else list(map(arrowtext, value)) for value in values]
+            else:
+                values = list(map(arrowtext, values))
+            arrays.append(pyarrow.array(values, type=field.type))
+            continue
+        raise ValueError(f'The column {field.name!r} has values that do not fit its type {field.type} ({error}); '
+                         f'infer the schema from more records with sample_size, or pass a schema.') from error
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def recordrows(source, tag=None, sep='.', strip_cdata=False, remove_comments=False, remove_pis=False,
+               remove_blank_text=True, text_engine='single_pass', huge_tree=False, native_type=False,
+               native_type_attributes=False):
+    """
+    This function streams an xml file and yields every record element as a flattened row, see flattenrecord.
+    A failing element raises a ConversionError, since a row cannot be left out of a table silently.
+    :return: generator of dict.
+    """
+    records = RecordConverter(tag, strip_cdata=strip_cdata, header=False, compact=True,
+                              remove_blank_text=remove_blank_text, text_engine=text_engine, errors='strict',
+                              native_type=native_type, native_type_attributes=native_type_attributes)
+    events = etree.iterparse(source, events=('start', 'end'), remove_comments=remove_comments, remove_pis=remove_pis,
+                             strip_cdata=strip_cdata, huge_tree=huge_tree)
+    for record in records.convert(events):
+        for node in record.values():
+            yield flattenrecord(node, sep)
+
+
+def xml2arrow(source, tag=None, sample_size=1000, batch_size=65536, schema=None, sep='.', strip_cdata=False,
+              remove_comments=False, remove_pis=False, remove_blank_text=True, text_engine='single_pass',
+              huge_tree=False, native_type=False, native_type_attributes=False):
+    """
+    This function streams the record elements of an xml file into pyarrow RecordBatches (requires pyarrow).
+    Every record becomes a row with a column per attribute, text and nested child path, in xml-js compact naming,
+    see flattenrecord. Only one batch of rows is held in memory at a time, besides the schema sample.
+    The schema is fixed before the first batch: columns first seen after the sample are dropped, a list column
+    takes single values as one-item lists, and a string column takes other values as text. A column the sample
+    saw as single values that later repeats raises a ValueError naming it, as does any other type mismatch.
+    :param source: str path or file object opened in binary mode,
+    :param tag: str, the record tag or path, see recordmatcher; the children of the root element if not given,
+    :param sample_size: int, the number of leading records the schema is inferred from, see arrowschema; a larger
+                        sample catches more repeated and optional columns,
+    :param batch_size: int, the maximum number of rows per batch,
+    :param schema: pyarrow.Schema object, used instead of inferring one; columns outside it are dropped,
+    :param sep: str, the separator of the keys in a column name,
+    :param strip_cdata: bool, whether to parse CDATA as pure text or CDATA text,
+    :param remove_comments: bool, whether to drop comments,
+    :param remove_pis: bool, whether to drop processing instructions,
+    :param remove_blank_text: bool, whether to remove empty text from all text fields,
+    :param text_engine: str, 'single_pass' indexes CDATA once per record, 'tostring' serializes every element,
+    :param huge_tree: bool, whether to lift libxml2's depth and size limits,
+    :param native_type: bool, whether numeral and boolean texts become numbers and booleans, see walkelement,
+    :param native_type_attributes: bool, the same for attribute values,
+    :return: generator of pyarrow.RecordBatch objects, all with the same schema.
+    """
+    pyarrow = optionalmodule('pyarrow', 'arrow')
+    rows = recordrows(source, tag, sep, strip_cdata, remove_comments, remove_pis, remove_blank_text, text_engine,
+                      huge_tree, native_type, native_type_attributes)
+    if schema is None:
+        sample = list(islice(rows, sample_size))
+        schema = arrowschema(sample)
+        rows = chain(sample, rows)
+    repeated = [field.name for field in schema if pyarrow.types.is_list(field.type)]
+    integral = [(field.name, pyarrow.types.is_list(field.type)) for field in schema
+                if pyarrow.types.is_integer(field.type.value_type if pyarrow.types.is_list(field.type) else field.type)]
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        # A column the sample saw repeated is a list column, so single values in later rows are wrapped.
+        for row in batch:
+            for column in repeated:
+                value = row.get(column)
+                if value is not None and not isinstance(value, list):
+                    row[column] = [value]
+        try:
+            if not all(arrowintegral([row.get(column) for row in batch], is_list) for column, is_list in integral):
+                raise pyarrow.ArrowInvalid('a value that is not an integer would be truncated')
+            record_batch = pyarrow.RecordBatch.from_pylist(batch, schema=schema)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            record_batch = arrowbatch(batch, schema)
+        yield record_batch
+
+
+def xml2arrow_file(source, destination, tag=None, file_format='parquet', sample_size=1000, batch_size=65536,
+                   schema=None, **options):
+    """
+    This function writes the record elements of an xml file to a Parquet or Feather file, one batch at a time
+    (requires pyarrow), see xml2arrow.
+    :param source: str path or file object opened in binary mode,
+    :param destination: str path or file object opened in binary mode,
+    :param tag: str, the record tag or path, see recordmatcher; the children of the root element if not given,
+    :param file_format: str, one of ARROW_FORMATS,
+    :param sample_size: int, the number of leading records the schema is inferred from,
+    :param batch_size: int, the maximum number of rows per batch, and so per Parquet row group,
+    :param schema: pyarrow.Schema object, used instead of inferring one,
+    :param options: other keyword options of xml2arrow,
+    :return: int, the number of rows written.
+    """
+    if file_format not in ARROW_FORMATS:
+        raise ValueError(f'The file format must be one of {ARROW_FORMATS}.')
+    batches = xml2arrow(source, tag, sample_size, batch_size, schema, **options)
+    first = next(batches, None)
+    if first is None:
+        return 0
+    if file_format == 'parquet':
+        writer = optionalmodule('pyarrow.parquet', 'arrow').ParquetWriter(destination, first.schema)
+    else:
+        writer = optionalmodule('pyarrow.ipc', 'arrow').new_file(destination, first.schema)
+    rows = 0
+    with writer:
+        for batch in chain([first], batches):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+async def xml2json_async(xml, executor=None, slice_size=None, chunk_size=65536, **options):
+    """
+    This function is xml2json for asyncio code; the output is the same as xml2json(xml, **options).
+    By default the conversion runs in an executor so the event loop is not blocked. With slice_size it runs on the
+    event loop instead, feeding the parser chunk_size characters and converting slice_size nodes at a time,
+    and giving control back to the loop between slices; with select or lazy the document is still parsed in
+    slices, but converted in one step.
+    :param xml: str or bytes, the xml document, an os.PathLike path to it, or a buffer holding it, see parsexml,
+    :param executor: concurrent.futures.Executor object, the loop's default executor if not given,
+    :param slice_size: int, the number of nodes converted per slice on the event loop,
+    :param chunk_size: int, the number of characters parsed per slice on the event loop,
+    :param options: keyword options of xml2json,
+    :return: dict.
+    """
+    if not slice_size:
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(xml2json, xml, **options))
+    if isinstance(xml, os.PathLike):
+        with mapfile(xml) as data:
+            return await xml2json_async(data, executor, slice_size, chunk_size, **options)
+    if not isinstance(xml, str) and not isinstance(xml, bytes):
+        try:
+            xml = memoryview(xml).cast('B')
+        except TypeError:
+            raise TypeError('The input xml not string, byte, path or buffer format.') from None
+    remove_comments = options.pop('remove_comments', False)
+    remove_pis = options.pop('remove_pis', False)
+    strip_cdata = options.pop('strip_cdata', False)
+    huge_tree = options.pop('huge_tree', False)
+    # A cached parser cannot be used: other coroutines on this thread may parse while this one is suspended.
+    parser = options.pop('parser', None) or XMLParser(remove_comments=remove_comments, remove_pis=remove_pis,
+                                                      strip_cdata=strip_cdata, huge_tree=huge_tree)
+    for start in range(0, len(xml), chunk_size):
+        chunk = xml[start:start + chunk_size]
+        parser.feed(chunk if isinstance(chunk, (str, bytes)) else bytes(chunk))
+        await asyncio.sleep(0)
+    root = parser.close()
+    if options.get('select') or options.get('lazy'):
+        return convertelement(root, strip_cdata=strip_cdata, **options)
+    if options.pop('engine', 'iterative') not in CONVERT_ENGINES:
+        raise ValueError(f'The engine must be one of {CONVERT_ENGINES}.')
+    options.pop('select', None)
+    options.pop('lazy', None)
+    options['dict_type'] = options.get('dict_type') or DEFAULT_DICT
+    errors = options.pop('errors', 'return')
+    # Like walkelement, the default errors mode gives back the exception instead of raising it.
+    try:
+        for output in walkslices(root, strip_cdata=strip_cdata, slice_size=slice_size, errors=errors, **options):
+            if output is not None:
+                return output
+            await asyncio.sleep(0)
+    except Exception as e:
+        if errors != 'return':
+            raise
+        return Exception(e)
+
+
+async def xml2json_aiter(source, tag=None, executor=None, queue_size=64, **options):
+    """
+    This async generator is the asyncio counterpart of xml2json_iter.
+    An async iterable of str or bytes chunks, e.g. an aiohttp response body, is fed to a FeedConverter
+    on the event loop. A path or file object is converted by xml2json_iter in an executor thread, which
+    waits whenever queue_size records are ready but not consumed yet.
+    :param source: async iterable of chunks, str path or file object opened in binary mode,
+    :param tag: str, the record tag or path, see recordmatcher; required for paths and file objects,
+    :param executor: concurrent.futures.Executor object, the loop's default executor if not given,
+    :param queue_size: int, the number of converted records buffered ahead of the consumer,
+    :param options: keyword options of xml2json_iter,
+    :return: async generator of dicts.
+    """
+    if hasattr(source, '__aiter__'):
+        converter = FeedConverter(tag, **options)
+        async for chunk in source:
+            for record in converter.feed(chunk):
+                yield record
+        for record in converter.close():
+            yield record
+        return
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    end = object()
+
+    def produce():
+        try:
+            for record in xml2json_iter(source, tag, **options):
+                asyncio.run_coroutine_threadsafe(queue.put((record, None)), loop).result()
+                if stop.is_set():
+                    return
+        except Exception as e:
+            asyncio.run_coroutine_threadsafe(queue.put((end, e)), loop).result()
+        else:
+            asyncio.run_coroutine_threadsafe(queue.put((end, None)), loop).result()
+
+    producer = loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            record, error = await queue.get()
+            if record is end:
+                if error is not None:
+                    raise error
+                break
+            yield record
+    finally:
+        stop.set()
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait([producer], timeout=0.01)
+
+
+def xmlvalue(value):
+    """
+    This function turns a JSON scalar back into xml text.
+    :param value: str, bool, number or None,
+    :return: str.
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return '' if value is None else str(value)
+
+
+def xmlattributes(attributes):
+    """
+    This function turns a JSON attribute mapping back into xml attribute values.
+    :param attributes: mapping or None,
+    :return: dict.
+    """
+    if not isinstance(attributes, Mapping):
+        return {}
+    return {name: xmlvalue(value) for name, value in attributes.items()}
+
+
+def compactnodes(node):
+    """
+    This function lists the content of a compact JSON node as (key, value) pairs, one per xml node.
+    Lists are expanded lazily, so they may be generators.
+    :param node: mapping, a compact JSON node,
+    :return: generator of (str, value) tuples.
+    """
+    for key, value in node.items():
+        if key in ('_attributes', '_declaration'):
+            continue
+        if value is None or isinstance(value, (str, Mapping, bool, int, float)):
+            yield key, value
+        else:
+            for item in value:
+                yield key, item
+
+
+def json2xml(data, output=None, compact=False, encoding=None):
+    """
+    This function writes xml-js format JSON, as produced by xml2json, back to xml.
+    The xml is written through etree.xmlfile as the input is walked, without building a tree,
+    and every list in the input may be a generator, so large inputs convert in constant memory.
+    :param data: mapping, the compact or non-compact JSON,
+    :param output: str path or binary file object; the xml is returned as bytes if not given,
+    :param compact: bool, whether data is in compact format,
+    :param encoding: str, the output encoding, taken from the declaration or utf-8 if not given,
+    :return: bytes if output is not given, else None.
+    """
+    declaration = data.get('_declaration' if compact else 'declaration')
+    attributes = (declaration or {}).get('_attributes' if compact else 'attributes') or {}
+    encoding = encoding or attributes.get('encoding') or 'utf-8'
+    target = BytesIO() if output is None else output
+    end = object()
+    with etree.xmlfile(target, encoding=encoding) as xf:
+        if declaration is not None:
+            xf.write_declaration(standalone={'yes': True, 'no': False}.get(attributes.get('standalone')))
+        stack = [(compactnodes(data) if compact else iter(data.get('elements') or ()), None)]
+        while stack:
+            nodes, context = stack[-1]
+            node = next(nodes, end)
+            if node is end:
+                stack.pop()
+                if context is not None:
+                    context.__exit__(None, None, None)
+                continue
+            if compact:
+                key, value = node
+                if key == '_text':
+                    xf.write(xmlvalue(value))
+                elif key == '_cdata':
+                    xf.write(etree.CDATA(xmlvalue(value)))
+                elif key == '_comment':
+                    xf.write(etree.Comment(xmlvalue(value)))
+                elif key == '_instruction':
+                    for target_name, instruction in value.items():
+                        xf.write(etree.ProcessingInstruction(target_name, xmlvalue(instruction)))
+                elif isinstance(value, Mapping):
+                    context = xf.element(key, xmlattributes(value.get('_attributes')))
+                    context.__enter__()
+                    stack.append((compactnodes(value), context))
+                else:
+                    with xf.element(key):
+                        xf.write(xmlvalue(value))
+                continue
+            node_type = node.get('type')
+            if node_type == 'element':
+                context = xf.element(node['name'], xmlattributes(node.get('attributes')))
+                context.__enter__()
+                stack.append((iter(node.get('elements') or ()), context))
+            elif node_type == 'text':
+                xf.write(xmlvalue(node.get('text')))
+            elif node_type == 'cdata':
+                xf.write(etree.CDATA(xmlvalue(node.get('cdata'))))
+            elif node_type == 'comment':
+                xf.write(etree.Comment(xmlvalue(node.get('comment'))))
+            elif node_type == 'instruction':
+                xf.write(etree.ProcessingInstruction(node['name'], xmlvalue(node.get('instruction'))))
+            else:
+                raise ValueError(f'The node type {node_type!r} is not an xml-js node type.')
+    if output is None:
+        return target.getvalue()
+
+
+class Profiler(object):
+    """
+    This class records where conversion time goes, per stage and per tag, while it is active as a context manager:
+        with Profiler() as profiler:
+            xml2json(xml)
+        profiler.stats(), profiler.prometheus()
+    The stages are parse (parsexml), cdata (CDataIndex), text (text fields), leaf (comments, instructions and
+    childless elements), build (the rest of walkelement and parseelement: the walk, attribute copying and dict
+    building) and serialize (the rest of dumpelement, which xml2json_string uses, and of dumpbinary). Times are
+    exclusive, so a stage nested in another is not counted twice.
+    Entering sets the module's PROFILER hook, which every stage tests, and leaving clears it. Only one profiler can
+    be active, and it records the conversions of the thread that entered it; other threads run unprofiled.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, callback=None):
+        """
+        :param callback: function, called with the stats dict when the profiler is left.
+        """
+        self.callback = callback
+        self.stages = {stage: [0.0, 0] for stage in ('parse', 'cdata', 'text', 'leaf', 'build', 'serialize')}
+        self.tags = {}
+        self.bytes_serialized = 0
+        self.thread = None
+        self._tag = None
+        self._nested = []
+
+    def tagstats(self, tag):
+        """
+        This function returns the counters of a tag, creating them on first use.
+        :param tag: str,
+        :return: dict.
+        """
+        if tag not in self.tags:
+            self.tags[tag] = dict(elements=0, attributes=0, lists_promoted=0, text_seconds=0.0, leaf_seconds=0.0)
+        return self.tags[tag]
+
+    def begin(self, stage):
+        """
+        This function starts timing a stage call, see end.
+        :param stage: str, the stage name,
+        :return: int, the token to hand to end, or None on a thread that is not profiled.
+        """
+        if threading.get_ident() != self.thread:
+            return None
+        if stage == 'leaf':
+            # Comments and instructions have no tag of their own; an element leaf names itself in element.
+            self._tag = None
+        self._nested.append([stage, 0.0, time.perf_counter()])
+        return len(self._nested) - 1
+
+    def end(self, token):
+        """
+        This function records the time of a stage call, less that of the stages nested in it.
+        :param token: int, given by begin.
+        """
+        now = time.perf_counter()
+        nested = self._nested
+        # Calls left by an exception are dropped, their time stays in this one.
+        del nested[token + 1:]
+        stage, inner, start = nested.pop()
+        seconds = now - start
+        exclusive = seconds - inner
+        if nested:
+            nested[-1][1] += seconds
+        totals = self.stages[stage]
+        totals[0] += exclusive
+        totals[1] += 1
+        if stage in ('text', 'leaf') and self._tag is not None:
+            self.tags[self._tag][f'{stage}_seconds'] += exclusive
+
+    def element(self, element):
+        """
+        This function counts an element and its attributes, which the following text and leaf times are booked to.
+        :param element: etree._Element object.
+        """
+        if threading.get_ident() != self.thread:
+            return
+        stats = self.tagstats(element.tag)
+        stats['elements'] += 1
+        stats['attributes'] += len(element.attrib)
+        self._tag = element.tag
+
+    def promoted(self, key):
+        """
+        This function counts a compact key turned into a list.
+        :param key: str.
+        """
+        if threading.get_ident() == self.thread:
+            self.tagstats(key)['lists_promoted'] += 1
+
+    def serialized(self, text):
+        """
+        This function counts the bytes of JSON text or binary output written.
+        :param text: str, counted in UTF-8, or bytes.
+        """
+        if threading.get_ident() == self.thread:
+            if isinstance(text, bytes) or text.isascii():
+                self.bytes_serialized += len(text)
+            else:
+                self.bytes_serialized += len(text.encode('utf-8'))
+
+    def __enter__(self):
+        global PROFILER
+        with Profiler._lock:
+            if PROFILER is not None:
+                raise RuntimeError('A Profiler is already active.')
+            self.thread = threading.get_ident()
+            PROFILER = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global PROFILER
+        PROFILER = None
+        self.thread = None
+        self._nested = []
+        if self.callback is not None:
+            self.callback(self.stats())
+
+    def stats(self):
+        """
+        This function exports the recorded figures.
+        :return: dict of stages (seconds and calls per stage), tags (elements, attributes, lists_promoted,
+                 text_seconds and leaf_seconds per tag), elements, lists_promoted and bytes_serialized.
+        """
+        tags = {str(tag): dict(stats) for tag, stats in self.tags.items()}
+        stages = {stage: dict(seconds=seconds, calls=calls) for stage, (seconds, calls) in self.stages.items()}
+        return dict(stages=stages, tags=tags, elements=sum(stats['elements'] for stats in tags.values()),
+                    lists_promoted=sum(stats['lists_promoted'] for stats in tags.values()),
+                    bytes_serialized=self.bytes_serialized)
+
+    def prometheus(self, prefix='xml2js'):
+        """
+        This function exports the recorded figures in the Prometheus text exposition format.
+        :param prefix: str, the metric name prefix,
+        :return: str.
+        """
+        def label(value):
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        stats = self.stats()
+        metrics = [('stage_seconds_total', 'Seconds spent per conversion stage.', 'stage',
+                    {stage: values['seconds'] for stage, values in stats['stages'].items()}),
+                   ('stage_calls_total', 'Calls per conversion stage.', 'stage',
+                    {stage: values['calls'] for stage, values in stats['stages'].items()})]
+        for name, description in (('elements', 'Elements converted per tag.'),
+                                  ('attributes', 'Attributes copied per tag.'),
+                                  ('lists_promoted', 'Compact keys turned into lists per tag.'),
+                                  ('text_seconds', 'Seconds spent on text fields per tag.'),
+                                  ('leaf_seconds', 'Seconds spent on leaf nodes per tag.')):
+            metrics.append((f'{name}_total', description, 'tag',
+                            {tag: values[name] for tag, values in stats['tags'].items()}))
+        lines = []
+        for name, description, key, values in metrics:
+            lines.append(f'# HELP {prefix}_{name} {description}')
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            lines.extend(f'{prefix}_{name}{{{key}="{label(item)}"}} {value}' for item, value in values.items())
+        lines.append(f'# HELP {prefix}_bytes_serialized_total Bytes of JSON text written.')
+        lines.append(f'# TYPE {prefix}_bytes_serialized_total counter')
+        lines.append(f'{prefix}_bytes_serialized_total {stats["bytes_serialized"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def openxml(stream):
+    """
+    This function prepares a binary stream for xml streaming, decompressing gzip, bz2 and xz input by its magic bytes.
+    A decompressor does not close the stream it reads, so the caller closes both.
+    :param stream: binary file object with peek, e.g. a file opened in 'rb' mode or sys.stdin.buffer,
+    :return: binary file object, the decompressor, or the stream itself when it is not compressed.
+    """
+    head = stream.peek(6)[:6]
+    for magic, compressed in COMPRESSED_MAGIC:
+        if head.startswith(magic):
+            return compressed(stream)
+    return stream
+
+
+def main(argv=None):
+    """
+    This function is the command line entry point: it streams an xml file and writes the xml-js format JSON of
+    every record element as one line (NDJSON / JSON Lines).
+    :param argv: list of str, the arguments, sys.argv[1:] if not given,
+    :return: int, the exit status.
+    """
+    parser = argparse.ArgumentParser(prog='xml2js', description='Stream xml records as xml-js JSON lines.')
+    parser.add_argument('input', nargs='?', default='-', help='xml file, gzip/bz2/xz compressed or not, - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='output file, - for stdout')
+    parser.add_argument('-t', '--tag', help="record tag or path such as 'catalog/product', the root's children "
+                                            "if not given")
+    parser.add_argument('-c', '--compact', action='store_true', help='write the compact format')
+    parser.add_argument('--header', action='store_true', help='include the declaration in every record')
+    parser.add_argument('--strip-cdata', action='store_true', help='read CDATA as plain text')
+    parser.add_argument('--remove-comments', action='store_true', help='drop comments')
+    parser.add_argument('--remove-pis', action='store_true', help='drop processing instructions')
+    parser.add_argument('--keep-blank-text', action='store_true', help='keep whitespace-only text')
+    parser.add_argument('--huge-tree', action='store_true', help="lift libxml2's depth and size limits")
+    parser.add_argument('--no-ensure-ascii', dest='ensure_ascii', action='store_false',
+                        help='write non-ASCII characters as UTF-8 instead of escaping them')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='worker processes converting and serializing records, 0 for one per CPU')
+    parser.add_argument('--chunksize', type=int, default=256, help='records sent to a worker at a time')
+    args = parser.parse_args(argv)
+
+    options = dict(strip_cdata=args.strip_cdata, header=args.header, compact=args.compact,
+                   remove_blank_text=not args.keep_blank_text)
+    try:
+        stream = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+        source = openxml(stream)
+        output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    except OSError as e:
+        parser.error(f"can't open '{e.filename or args.input}': {e.strerror or e}")
+    events = etree.iterparse(source, events=('start', 'end'), remove_comments=args.remove_comments,
+                             remove_pis=args.remove_pis, strip_cdata=args.strip_cdata, huge_tree=args.huge_tree)
+    if args.jobs == 1:
+        lines = RecordConverter(args.tag, dumpelement, ensure_ascii=args.ensure_ascii, **options).convert(events)
+    else:
+        # Records travel to the workers as xml bytes, so parsing stays here and conversion runs in parallel.
+        records = RecordConverter(args.tag, tostring, with_tail=False).convert(events)
+        lines = xml2json_many(records, workers=args.jobs or None, chunksize=args.chunksize, serialize=True,
+                              ensure_ascii=args.ensure_ascii, huge_tree=args.huge_tree, **options)
+    try:
+        for line in lines:
+            if isinstance(line, ConversionError):
+                # A record the workers failed on; stop like the single process run does.
+                print(f'xml2js: {line}', file=sys.stderr)
+                return 1
+            output.write(line.encode('utf-8'))
+            output.write(b'\n')
+        output.flush()
+    except etree.XMLSyntaxError as e:
+        print(f'xml2js: {e}', file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader went away, e.g. head; point stdout at devnull so the flush at exit does not fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if args.output != '-':
+            output.close()
+        if args.input != '-':
+            source.close()
+            stream.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())